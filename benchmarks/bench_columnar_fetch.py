@@ -0,0 +1,69 @@
+# benchmarks/bench_columnar_fetch.py
+# Times the columnar fetch (fetch_workout_columns, which the batch analytics job reads
+# histories with) against fetching the same rows as tuples, and checks both return the same
+# history. Needs DATABASE_URL.
+#
+# Run from the repo root:  python benchmarks/bench_columnar_fetch.py USERID [USERID ...]
+import sys
+import time
+import numpy as np
+from utils.db import get_db_connection, fetch_workout_columns
+
+
+def best_of(func, *args, repeat=5):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def fetch_rows(userid):
+    with get_db_connection() as conn, conn.cursor() as cur:
+        cur.execute("""
+            SELECT workoutname, muscleid, equipmentid, weightused, setschosen, repschosen
+            FROM workoutquestions
+            WHERE userid = %s
+        """, (userid,))
+        return cur.fetchall()
+
+
+# Columnar arrays back as row tuples, with NULLs as the columnar fetch encodes them
+def columns_to_rows(names, columns):
+    workoutnames = [names[code] if code >= 0 else None for code in columns['workoutname'].tolist()]
+    weights = [None if np.isnan(weight) else weight for weight in columns['weightused'].tolist()]
+    ids = [[None if value == -1 else value for value in columns[column].tolist()]
+           for column in ('muscleid', 'equipmentid')]
+    return list(zip(workoutnames, *ids, weights,
+                    columns['setschosen'].tolist(), columns['repschosen'].tolist()))
+
+
+# Rows in a comparable form. Neither fetch orders a member's rows, so they are sorted here.
+def normalized(rows):
+    return sorted(((name, muscleid, equipmentid, None if weight is None else float(weight), sets or 0, reps or 0)
+                   for name, muscleid, equipmentid, weight, sets, reps in rows), key=repr)
+
+
+def main(userids):
+    print(f"{'userid':>8} {'rows':>10} {'tuples (ms)':>12} {'columnar (ms)':>14} {'speedup':>8}")
+    for userid in userids:
+        rows = fetch_rows(userid)
+        columnar = columns_to_rows(*fetch_workout_columns([userid]))
+        assert normalized(columnar) == normalized(rows), f"histories differ for user {userid}"
+
+        old = best_of(fetch_rows, userid)
+        new = best_of(fetch_workout_columns, [userid])
+        print(f"{userid:>8} {len(rows):>10,} {old * 1000:>12.1f} {new * 1000:>14.1f} {old / new:>7.1f}x")
+
+    if len(userids) > 1:
+        old = best_of(lambda: [fetch_rows(userid) for userid in userids])
+        new = best_of(fetch_workout_columns, userids)
+        print(f"all {len(userids)} users: tuples {old * 1000:.1f} ms, fetch_workout_columns {new * 1000:.1f} ms")
+    print("Histories match.")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        sys.exit("usage: python benchmarks/bench_columnar_fetch.py USERID [USERID ...]")
+    main([int(arg) for arg in sys.argv[1:]])
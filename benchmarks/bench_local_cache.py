@@ -0,0 +1,106 @@
+# benchmarks/bench_local_cache.py
+# Times View Data loads served from the local cache: a fresh process (nothing in memory) loading
+# each user's totals, analysis and ranks from a seeded cache file. Runs without Postgres:
+# DATABASE_URL is cleared, and the benchmark fails if any load would have opened a connection.
+# Also checks that the cache stays under LOCAL_CACHE_BYTES as users are added.
+#
+# Run from the repo root:  python benchmarks/bench_local_cache.py
+import os
+import sys
+import time
+import datetime
+import tempfile
+import numpy as np
+
+CACHE_DIR = tempfile.mkdtemp()
+os.environ["LOCAL_CACHE_PATH"] = os.path.join(CACHE_DIR, "local_cache.sqlite3")
+os.environ["LOCAL_CACHE_BYTES"] = str(32 * 1024 * 1024)
+os.environ["LOCAL_CACHE_TTL"] = "3600"
+os.environ.pop("DATABASE_URL", None)
+
+from utils.db import db_async, db_local_cache  # noqa: E402
+from utils.db.db_analysis_queries import (  # noqa: E402
+    analysis_cache_key,
+    invalidate_analysis,
+    store_analysis,
+    workout_analysis_from_rows,
+)
+
+
+USERS = 200
+USER_WEIGHT = 180
+WORKOUT_NAMES = [f"Workout {i}" for i in range(30)]
+MUSCLE_GROUPS = [f"Muscle {i}" for i in range(12)]
+PARTS = ('analysis', 'analysis_version', 'ranks')
+
+
+# What the read functions would have returned for one user with a year of weekly progress
+def make_user(userid, rng):
+    weeks = [datetime.datetime(2025, 1, 6) + datetime.timedelta(weeks=w) for w in range(52)]
+    totals = {'total_workouts': 500, 'weighted_sets': 400, 'weight_lifted': 50_000.0,
+              'max_weighted_volume': 9_000.0, 'max_bodyweight_volume': 300.0,
+              'updated_at': datetime.datetime(2026, 1, 1, tzinfo=datetime.timezone.utc)}
+    analysis = workout_analysis_from_rows(
+        [(name, float(rng.uniform(1, 50)), float(rng.uniform(50, 400))) for name in WORKOUT_NAMES],
+        [(name, float(rng.uniform(1, 50)), int(rng.integers(1, 9)))
+         for name in WORKOUT_NAMES for _ in range(20)],
+        [(muscle, int(rng.integers(1, 200))) for muscle in MUSCLE_GROUPS],
+        [(week, name, float(rng.uniform(50, 400)), float(rng.uniform(1e3, 1e4)), int(rng.integers(1, 20)))
+         for name in WORKOUT_NAMES[:10] for week in weeks],
+        [(week, muscle, float(rng.uniform(1e3, 1e4)), int(rng.integers(1, 20)))
+         for week in weeks for muscle in MUSCLE_GROUPS],
+    )
+    ranks = [(name, float(rng.uniform(1, 50)), int(rng.integers(1, 5000)), int(rng.integers(1, 2500)))
+             for name in WORKOUT_NAMES]
+    return totals, analysis, ranks
+
+
+def seed(userids):
+    rng = np.random.default_rng(0)
+    for userid in userids:
+        totals, analysis, ranks = make_user(userid, rng)
+        db_local_cache.local_put(userid, 'metric_totals', totals)
+        db_local_cache.local_put(userid, 'ranks', ranks)
+        store_analysis(userid, analysis_cache_key(USER_WEIGHT, totals), analysis)
+
+
+def cache_bytes():
+    with db_local_cache.local_cache_connection() as db:
+        return db.execute("SELECT total(size), COUNT(*) FROM cache_entries").fetchone()
+
+
+def main():
+    userids = list(range(1, USERS + 1))
+    seed(userids)
+    invalidate_analysis()  # As in a freshly started process
+    size, entries = cache_bytes()
+    print(f"Seeded {USERS} users: {entries} entries, {size / 1e6:.1f} MB")
+
+    times = []
+    for userid in userids:
+        start = time.perf_counter()
+        data = db_async.load_dashboard_data(userid, USER_WEIGHT, parts=PARTS)
+        times.append(time.perf_counter() - start)
+        if data['analysis'] is None or data['ranks'] is None:
+            print(f"User {userid}: missing data")
+            return 1
+    if db_async._async_pool is not None:
+        print("FAIL: a load went to Postgres")
+        return 1
+    times = np.array(times) * 1000
+    print(f"View Data load from the local cache: median {np.median(times):.2f} ms, "
+          f"p95 {np.percentile(times, 95):.2f} ms over {USERS} users")
+
+    # More users than fit: the least recently read entries are evicted
+    seed(range(USERS + 1, 5 * USERS + 1))
+    size, entries = cache_bytes()
+    print(f"After {5 * USERS} users: {entries} entries, {size / 1e6:.1f} MB "
+          f"(limit {db_local_cache.LOCAL_CACHE_BYTES / 1e6:.1f} MB)")
+    if size > db_local_cache.LOCAL_CACHE_BYTES:
+        print("FAIL: the cache is over its size limit")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+# benchmarks/bench_metrics.py
+# Validates the vectorized metrics engine against the previous pandas implementation
+# and times both at 10k, 100k and 1M rows.
+#
+# Run from the repo root:  python benchmarks/bench_metrics.py
+import time
+import numpy as np
+import pandas as pd
+from utils.analytics.metrics import compute_workout_metrics
+
+
+SIZES = [10_000, 100_000, 1_000_000]
+USER_WEIGHT = 180  # 0.97 * 180 is not a whole number, so the old float comparison can't misfire
+
+
+def make_workout_df(n, seed=0):
+    rng = np.random.default_rng(seed)
+    weight = rng.integers(5, 400, n)
+    weight[rng.random(n) < 0.3] = 0  # ~30% bodyweight sets
+    return pd.DataFrame({
+        'weightused': weight,
+        'setschosen': rng.integers(1, 11, n),
+        'repschosen': rng.integers(1, 31, n),
+    })
+
+
+# The pandas implementation the workout metrics used before the NumPy engine
+def legacy_metrics(workout_df, user_weight):
+    workout_df = workout_df.copy()
+    workout_df['adjusted_weight'] = workout_df['weightused'].astype(float)
+    workout_df.loc[workout_df['adjusted_weight'] == 0, 'adjusted_weight'] = 0.97 * user_weight
+    workout_df['strength_score'] = (
+        (workout_df['adjusted_weight'] * workout_df['repschosen'] * workout_df['setschosen']) / user_weight).round(3)
+    workout_df['training_volume'] = workout_df['setschosen'] * workout_df['repschosen'] * workout_df['adjusted_weight']
+    metrics = {
+        'total_workouts': len(workout_df),
+        'weight_lifted': workout_df[workout_df['adjusted_weight'] != 0.97 * user_weight]['weightused'].sum(),
+        'avg_weight': workout_df[workout_df['adjusted_weight'] != 0.97 * user_weight]['weightused'].mean(),
+        'max_strength_score': workout_df['strength_score'].max()
+    }
+    return metrics, workout_df
+
+
+def engine_metrics(workout_df, user_weight):
+    return compute_workout_metrics(
+        workout_df['weightused'].to_numpy(),
+        workout_df['setschosen'].to_numpy(),
+        workout_df['repschosen'].to_numpy(),
+        user_weight)
+
+
+def validate(workout_df, user_weight):
+    old_metrics, old_df = legacy_metrics(workout_df, user_weight)
+    new_metrics, columns = engine_metrics(workout_df, user_weight)
+
+    assert old_metrics['total_workouts'] == new_metrics['total_workouts']
+    for key in ('weight_lifted', 'avg_weight', 'max_strength_score'):
+        assert np.isclose(old_metrics[key], new_metrics[key], equal_nan=True), key
+    for column in ('adjusted_weight', 'strength_score', 'training_volume'):
+        assert np.allclose(old_df[column].to_numpy(), columns[column], atol=1e-3), column
+
+
+# NULL weights (NaN from the columnar fetch) count as bodyweight sets, as in the user_metrics
+# triggers, so the results match the same history with those weights set to 0
+def validate_null_weights(workout_df, user_weight):
+    with_nulls = workout_df.assign(weightused=workout_df['weightused'].astype(float))
+    with_nulls.loc[with_nulls.index[::7], 'weightused'] = np.nan
+    as_zero = with_nulls.fillna({'weightused': 0})
+    validate(as_zero, user_weight)
+
+    null_metrics, null_columns = engine_metrics(with_nulls, user_weight)
+    zero_metrics, zero_columns = engine_metrics(as_zero, user_weight)
+    for key, value in zero_metrics.items():
+        assert not np.isnan(null_metrics[key]), key
+        assert np.isclose(value, null_metrics[key]), key
+    for column, values in zero_columns.items():
+        assert np.array_equal(values, null_columns[column]), column
+
+
+def best_of(func, *args, repeat=5):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    # Edge cases: empty history, all bodyweight, all loaded, NULL weights
+    validate(make_workout_df(0), USER_WEIGHT)
+    validate(make_workout_df(100).assign(weightused=0), USER_WEIGHT)
+    validate(make_workout_df(100).assign(weightused=135), USER_WEIGHT)
+    validate_null_weights(make_workout_df(100), USER_WEIGHT)
+
+    print(f"{'rows':>10} {'pandas (ms)':>12} {'numpy (ms)':>12} {'speedup':>8}")
+    for n in SIZES:
+        workout_df = make_workout_df(n)
+        validate(workout_df, USER_WEIGHT)
+        old = best_of(legacy_metrics, workout_df, USER_WEIGHT)
+        new = best_of(engine_metrics, workout_df, USER_WEIGHT)
+        print(f"{n:>10,} {old * 1000:>12.2f} {new * 1000:>12.2f} {old / new:>7.1f}x")
+    print("Results match the previous implementation.")
+
+
+if __name__ == "__main__":
+    main()
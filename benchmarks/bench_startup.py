@@ -0,0 +1,84 @@
+# benchmarks/bench_startup.py
+# Measures cold-start import time of the app entry point (main.py, which serves the login
+# page) in fresh interpreters, prints import time per package from -X importtime, and exits
+# non-zero if the median is over budget or the login path imports the analytics stack.
+#
+# Run from the repo root:  python benchmarks/bench_startup.py [--budget-ms N] [--runs N]
+import os
+import sys
+import argparse
+import statistics
+import subprocess
+
+
+# Cold-start budget for `import main`, in milliseconds
+STARTUP_BUDGET_MS = float(os.getenv("STARTUP_BUDGET_MS", "1000"))
+
+# Modules the login page must not load; they belong to the dashboard
+HEAVY_MODULES = ['numpy', 'pandas', 'matplotlib', 'seaborn', 'interfaces.dashboard']
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = f"""
+import sys, time
+start = time.perf_counter()
+import main
+print(round((time.perf_counter() - start) * 1000, 1))
+print(",".join(m for m in {HEAVY_MODULES!r} if m in sys.modules))
+"""
+
+
+def run_probe(importtime=False):
+    args = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", PROBE]
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [REPO_ROOT, os.getenv("PYTHONPATH")])))
+    result = subprocess.run(args, cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=True)
+    elapsed, loaded = result.stdout.splitlines()[-2:]
+    return float(elapsed), [m for m in loaded.split(",") if m], result.stderr
+
+
+# (self microseconds, package) summed over every module of each top-level package,
+# from -X importtime output
+def import_time_by_package(stderr):
+    totals = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        if not self_us.strip().isdigit():
+            continue
+        package = name.strip().split(".")[0]
+        totals[package] = totals.get(package, 0) + int(self_us)
+    return sorted(((us, package) for package, us in totals.items()), reverse=True)
+
+
+def main(budget_ms, runs, top):
+    _, _, stderr = run_probe(importtime=True)
+    print(f"{'package':<40} {'import time (ms)':>16}")
+    for us, name in import_time_by_package(stderr)[:top]:
+        print(f"{name:<40} {us / 1000:>16.1f}")
+
+    times = []
+    for _ in range(runs):
+        elapsed, loaded, _ = run_probe()
+        times.append(elapsed)
+    median = statistics.median(times)
+    print(f"\nimport main: median {median:.0f} ms over {runs} runs "
+          f"(min {min(times):.0f}, max {max(times):.0f}), budget {budget_ms:.0f} ms")
+
+    failures = []
+    if loaded:
+        failures.append(f"login path imports {', '.join(loaded)}")
+    if median > budget_ms:
+        failures.append(f"cold start {median:.0f} ms is over the {budget_ms:.0f} ms budget")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cold-start import time of the app entry point.")
+    parser.add_argument("--budget-ms", type=float, default=STARTUP_BUDGET_MS)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="slowest packages to list")
+    args = parser.parse_args()
+    sys.exit(main(args.budget_ms, args.runs, args.top))
@@ -1,22 +1,12 @@
 import streamlit as st
-import psycopg
-import os
-from dotenv import load_dotenv
 from streamlit_option_menu import option_menu
+from utils.rerun_timing import set_rerun_tab
 from utils.db import (
-    check_user_exists,
+    authenticate_user,
     create_user,
-    get_user_details,
+    EmailTakenError,
 )
 
-# Load environment variables
-load_dotenv()
-
-
-# Connect to the DB
-def get_db_connection():
-    return psycopg.connect(os.getenv("DATABASE_URL"))
-
 def render_auth_page():
     col1, col2, col3 = st.columns([1, 2, 1])
     with col2:
@@ -35,6 +25,8 @@ def render_auth_page():
                 "nav-link-selected": {"background-color": "#eb4034"},
             })
         
+        set_rerun_tab(selected)
+
         # Initialize auth_tab if it doesn't exist
         if "auth_tab" not in st.session_state:
             st.session_state["auth_tab"] = "Login"
@@ -80,8 +72,8 @@ def render_signup_form():
 
 
 def handle_login(email, password):
-    if check_user_exists(email, password):
-        user_details = get_user_details(email)
+    authenticated, user_details = authenticate_user(email, password)
+    if authenticated:
         if user_details:
             update_session_state(user_details, email)
             st.session_state.authentication_status = "success"
@@ -108,28 +100,13 @@ def handle_signup(firstname, lastname, email, password, confirm_password, gender
         return
 
     try:
-        # Check for existing email
-        conn = get_db_connection()
-        cur = conn.cursor()
-        
-        cur.execute("SELECT email FROM \"User\" WHERE email = %s", (email,))
-        taken_emails = cur.fetchall()
-        
-        if taken_emails:  # If there are any results, email exists
-            st.error("This email is already taken!")
-            return
-            
-        # If we get here, attempt to create the user
+        # One transaction; the unique email index rejects taken addresses
         create_user(firstname, lastname, email, password, gender, weight)
         st.success("Account created! Please log in.")
-        
+    except EmailTakenError:
+        st.error("This email is already taken!")
     except Exception as e:
         st.error(f"Signup error: {str(e)}")
-    finally:
-        if 'cur' in locals():
-            cur.close()
-        if 'conn' in locals():
-            conn.close()
 
 
 def update_session_state(user_details, email):
@@ -1,21 +1,25 @@
 # pages/dashboard.py
+import functools
 import streamlit as st
 from streamlit_option_menu import option_menu
-from utils.analytics import calculate_user_metrics
 from interfaces.authentication import render_login_form
 import matplotlib.pyplot as plt
 import pandas as pd
 import seaborn as sns
 from utils.db import (
-    get_workout_questions,
-    insert_workout_data)
+    get_leaderboard,
+    enqueue_workout,
+    get_journal_status,
+    retry_failed_workouts,
+    discard_failed_workouts)
 from utils.workout.workout_utils import (
-    get_available_equipment,
-    get_workouts_for_muscle,
-    get_muscles_for_category,
     initialize_workout_selections,
-    broad_to_specific)
+    get_option_tree)
 from utils.styles import inject_custom_styles
+from utils.rerun_timing import rerun_stage, set_rerun_tab, fragment_timer
+from utils.chart_cache import get_chart_png
+from utils.loading import StagedLoader
+from utils.dashboard_data import DashboardData
 
 def render_dashboard():
     # Check if user is logged in
@@ -23,13 +27,8 @@ def render_dashboard():
         # If not logged in, show the login form
         render_login_form()
         return
-    # Load and process data
-    userid = st.session_state.get('userid')
-    user_weight = st.session_state.get('weight')
-    workout_data = get_workout_questions(userid)
-    
-    # Calculate all metrics at once
-    metrics, workout_df = calculate_user_metrics(workout_data, user_weight)
+    # Nothing is fetched until the selected tab asks for it
+    data = DashboardData(st.session_state.get('userid'), st.session_state.get('weight'))
 
     inject_custom_styles()
 
@@ -50,26 +49,59 @@ def render_dashboard():
                 "nav-link": {"margin": "0", "font-size": "16px", "background-color": "#393939", "border": "1px solid #ffffff"},
                 "nav-link-selected": {"background-color": "#eb4034", "font-weight": "600"},
             })
-
-    progress_bar = st.progress(0)
-    status_text = st.empty()
+    set_rerun_tab(selected)
 
     if selected == "Log Data":
-        for percent_complete in range(101):
-            progress_bar.progress(percent_complete)
-            status_text.text(f"Loading Log Data: {percent_complete}%")
+        # The form only needs the static workout catalog, so there is nothing to load
         render_log_workout_form()
+        render_sync_status()
     elif selected == "View Data":
-        for percent_complete in range(101):
-            progress_bar.progress(percent_complete)
-            status_text.text(f"Loading View Data: {percent_complete}%")
-        render_workout_data(metrics, workout_df)
+        render_view_data(data)
+
+
+# Seconds between refreshes of the pending/failed status under the Log Data form
+SYNC_STATUS_REFRESH = 2
+
+# View Data loads in these stages, in order. Each section is on the page as soon as its
+# stage finishes, while the progress bar reports the stage still running.
+VIEW_DATA_STAGES = [
+    ("load_dashboard_data", "Loading your stats"),
+    ("render_workout_data", "Rendering table"),
+    ("render_workout_charts", "Rendering charts"),
+    ("render_leaderboards", "Loading leaderboards"),
+]
+
+
+def render_view_data(data):
+    loader = StagedLoader("Loading View Data", VIEW_DATA_STAGES)
 
-    # Remove the progress bar and status text after loading
-    progress_bar.empty()
-    status_text.empty()
+    # Only the parts these widgets show: the workout analysis aggregates (which follow the
+    # stored totals) and the member's ranks, fetched concurrently
+    with loader.stage("load_dashboard_data"):
+        data.prefetch('analysis', 'analysis_version', 'ranks')
 
+    with loader.stage("render_workout_data"):
+        render_workout_data(data['analysis'])
+
+    with loader.stage("render_workout_charts"):
+        render_workout_charts(data['analysis'], data['analysis_version'])
+        with rerun_stage("render_progression"):
+            render_progression(data['analysis'], data['analysis_version'])
+
+    with loader.stage("render_leaderboards"):
+        render_leaderboards(data['ranks'])
+
+# The form is a fragment: picking a category, muscle, workout or equipment reruns only the
+# form, not the menu, styles or the rest of the page. Options come from the catalog's option tree.
+@st.fragment
 def render_log_workout_form():
+    with fragment_timer("render_log_workout_form", "Log Data"):
+        _render_log_workout_form()
+
+
+def _render_log_workout_form():
+    option_tree = get_option_tree()
+
     # Initialize session state variables if they don't exist
     if 'workout_selections' not in st.session_state:
         st.session_state.workout_selections = initialize_workout_selections()
@@ -86,7 +118,7 @@ def render_log_workout_form():
             # Radio buttons for broad category selection
             broad_category = st.radio(
                 "Choose Broad Category",
-                options=list(broad_to_specific.keys()), 
+                options=list(option_tree), 
                 key="broad_category"
             )
             # Force session state to update immediately
@@ -103,15 +135,14 @@ def render_log_workout_form():
             st.write("<p style='color: #EB4034; border: solid 1px white; border-radius: 8px; text-align: center;'>Muscle Group</p>", 
                     unsafe_allow_html=True)
             # Update available muscle groups based on selected broad category
-            muscle_groups = get_muscles_for_category(st.session_state.workout_selections['broad_category']) if st.session_state.workout_selections['broad_category'] else []
+            muscle_groups = option_tree.get(st.session_state.workout_selections['broad_category'], {})
             muscle_group = st.radio(
                 "Choose Muscle Group", 
-                options=muscle_groups, 
+                options=list(muscle_groups), 
                 key="muscle_group"
             )
             # Force session state to update immediately
             if muscle_group != st.session_state.workout_selections['muscle_group']:
-                workouts = get_workouts_for_muscle(muscle_group)
                 st.session_state.workout_selections.update({
                     'muscle_group': muscle_group,
                     'workout_name': None,  # Reset workout selection
@@ -125,10 +156,10 @@ def render_log_workout_form():
             st.write("<p style='color: #EB4034; border: solid 1px white; border-radius: 8px; text-align: center;'>Workout</p>", 
                     unsafe_allow_html=True)
             # Update available workouts based on selected muscle group
-            workouts = get_workouts_for_muscle(st.session_state.workout_selections['muscle_group']) if st.session_state.workout_selections['muscle_group'] else []
+            workouts = muscle_groups.get(st.session_state.workout_selections['muscle_group'], {})
             workout = st.radio(
                 "Choose Workout", 
-                options=workouts, 
+                options=list(workouts), 
                 key="workout_name"
             )
             # Force session state to update immediately
@@ -143,7 +174,7 @@ def render_log_workout_form():
             st.write("<p style='color: #EB4034; border: solid 1px white; border-radius: 8px; text-align: center;'>Equipment</p>", 
                     unsafe_allow_html=True)
             # Update available equipment based on selected workout
-            equipments = get_available_equipment(st.session_state.workout_selections['workout_name']) if st.session_state.workout_selections['workout_name'] else []
+            equipments = workouts.get(st.session_state.workout_selections['workout_name'], ())
             equipment = st.radio(
                 "Choose Equipment", 
                 options=equipments, 
@@ -177,7 +208,8 @@ def render_log_workout_form():
 
             submitted = st.form_submit_button("Log Workout")
             if submitted:
-                response = insert_workout_data(
+                # Saved to the local journal; the journal worker writes it to the database
+                response = enqueue_workout(
                     st.session_state.userid,
                     st.session_state.workout_selections['workout_name'],
                     st.session_state.workout_selections['muscle_group'],
@@ -185,29 +217,110 @@ def render_log_workout_form():
                     weight_used if st.session_state.workout_selections['equipment'] != "None" else 0,
                     sets,
                     reps,)
-                st.success("Workout Logged!")
+                if response["success"]:
+                    # Rerun the app so the sync status below starts polling for this set
+                    st.session_state.log_workout_notice = "Workout Logged!"
+                    st.rerun()
+                st.error(response["error"])
+            notice = st.session_state.pop('log_workout_notice', None)
+            if notice:
+                st.success(notice)
+
+
+# Logged sets that haven't reached the database yet, under the Log Data form. While sets are
+# pending the section polls every SYNC_STATUS_REFRESH seconds so the count drops as the journal
+# worker writes them; otherwise it doesn't poll. Streamlit only clears a fragment's timer on a
+# full app run, so switching between the two (after logging or retrying a set, and once the
+# last pending set is written) reruns the whole app. Failed sets can be retried or discarded.
+def render_sync_status():
+    status = get_journal_status(st.session_state.get('userid'))
+    if status['success'] and status['pending']:
+        st.session_state.sync_status_full_run = True
+        _poll_sync_status()
+    else:
+        _show_sync_status()
+
+
+def _render_sync_status(polling):
+    userid = st.session_state.get('userid')
+    status = get_journal_status(userid)
+
+    cols = st.columns((1, 2, 1))
+    with cols[1]:
+        if not status['success']:
+            st.warning(status['error'])
+            return
+        # Stop polling once everything is written. Not on the app run that started it, which
+        # would rerun again right away (and drop the form's notice) if the set is already written.
+        full_run = st.session_state.pop('sync_status_full_run', False)
+        if polling and not status['pending'] and not full_run:
+            st.rerun()
+
+        if status['pending']:
+            message = f"{status['pending']} logged set(s) waiting to be saved to your history."
+            if status['last_error']:
+                message += f" Retrying: {status['last_error']}"
+            st.info(message)
+
+        if status['failed']:
+            st.error(f"{len(status['failed'])} logged set(s) could not be saved.")
+            st.dataframe(
+                pd.DataFrame(status['failed'], columns=['entryid', 'workoutname', 'logged_at', 'error']),
+                use_container_width=True,
+                hide_index=True,
+                column_order=['workoutname', 'logged_at', 'error'],
+                column_config={
+                    "workoutname": st.column_config.Column("Workout Name", width="small"),
+                    "logged_at": st.column_config.Column("Logged At"),
+                    "error": st.column_config.Column("Error"),
+                }
+            )
+            buttons = st.columns(2)
+            if buttons[0].button("Retry", key="retry_failed_workouts", use_container_width=True):
+                response = retry_failed_workouts(userid)
+                if not response["success"]:
+                    st.warning(response["error"])
+                    return
+                st.rerun()  # Start polling
+            if buttons[1].button("Discard", key="discard_failed_workouts", use_container_width=True):
+                response = discard_failed_workouts(userid)
+                if not response["success"]:
+                    st.warning(response["error"])
+                    return
+                st.rerun(scope="fragment")
+
+
+@st.fragment(run_every=SYNC_STATUS_REFRESH)
+def _poll_sync_status():
+    _render_sync_status(polling=True)
 
 
+@st.fragment
+def _show_sync_status():
+    _render_sync_status(polling=False)
 
-def render_workout_data(metrics, workout_df):
+
+# Show a chart from the rendered-chart cache. plot(*args) only runs when the user's data,
+# the chart or the theme has changed since it was last drawn.
+def show_chart(version, chart, plot, *args):
+    def render():
+        apply_chart_theme()
+        return plot(*args)
+
+    with rerun_stage(plot.__name__):
+        png = get_chart_png(st.session_state.get('userid'), version, chart, CHART_THEME, render)
+    if png:
+        with rerun_stage("st_image"):
+            st.image(png, use_container_width=True)
+
+
+def render_workout_data(analysis):
 
     scorecol = st.columns((.5, 3, .5))
     with scorecol[1]:
         st.write("<h4 style='color: #EB4034; text-align: center;'>Workout Analysis</h4>", unsafe_allow_html=True)
-        # Use the pre-calculated strength scores from workout_df
-        analysis_df = workout_df[['workoutname', 'strength_score', 'adjusted_weight']].copy()
-        
-        # Filter out workouts with a strength score of 0
-        analysis_df = analysis_df[analysis_df['strength_score'] > 0]
-        
-        # Get the maximum strength score for each workout
-        analysis_df = analysis_df.groupby('workoutname').agg(
-            max_strength_score=('strength_score', 'max'),
-            max_weight_lifted=('adjusted_weight', 'max')
-        ).reset_index()
-        
-        # Sort values by max_strength_score for clarity
-        analysis_df = analysis_df.sort_values('max_strength_score', ascending=False)
+        # Best strength score per workout, aggregated in the database and sorted strongest first
+        analysis_df = analysis['workout_bests']
         
         # Display the workout analysis dataframe
         st.dataframe(
@@ -223,30 +336,108 @@ def render_workout_data(metrics, workout_df):
             }
         )
 
-    # Create columns for 2 cards below
+
+# Sets per muscle group and strength scores per workout, side by side
+def render_workout_charts(analysis, version=None):
     cols = st.columns((2, .1, 2))
     with cols[0]:
-        muscle_group_counts = workout_df['muscle_group'].value_counts()
-        fig = plot_muscle_group_bar_chart(muscle_group_counts)
-        if fig:
-            st.pyplot(fig)
+        show_chart(version, "muscle_group_counts", plot_muscle_group_bar_chart, analysis['muscle_group_counts'])
     with cols[2]:
-        fig = plot_workout_strength_scores(workout_df)
-        if fig:
-            st.pyplot(fig)
+        show_chart(version, "strength_scores", plot_workout_strength_scores, analysis['strength_scores'])
             
 
-plt.rcParams['figure.facecolor'] = '#0E1118'
-plt.rcParams['axes.facecolor'] = '#0E1118'
-plt.rcParams['savefig.facecolor'] = '#0E1118'
-plt.rcParams['savefig.edgecolor'] = '#0E1118'
-plt.rcParams['text.color'] = 'white'
-plt.rcParams['axes.labelcolor'] = 'white'
-plt.rcParams['xtick.color'] = 'white'
-plt.rcParams['ytick.color'] = 'white'
-
-def plot_workout_strength_scores(workout_df):
-    if workout_df.empty:
+# Estimated one-rep max and personal records over time for a chosen workout, and weekly
+# volume per muscle group. Only sets logged since timestamps were recorded are included.
+def render_progression(analysis, version=None):
+    progress = analysis['progress']
+    if progress.empty:
+        return
+
+    cols = st.columns((.5, 3, .5))
+    with cols[1]:
+        st.write("<h4 style='color: #EB4034; text-align: center;'>Progression</h4>", unsafe_allow_html=True)
+        workout = st.selectbox("Workout", progress['workoutname'].unique(), key="progression_workout")
+        records = progress[progress['workoutname'] == workout]
+        st.dataframe(
+            records.loc[records['is_pr'], ['week', 'best_e1rm']].sort_values('week', ascending=False),
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                "week": st.column_config.DateColumn("Week Of"),
+                "best_e1rm": st.column_config.NumberColumn("Personal Record (Est. 1RM)", format="%.1f"),
+            }
+        )
+
+    cols = st.columns((2, .1, 2))
+    with cols[0]:
+        show_chart(version, ("one_rep_max", workout), plot_one_rep_max_progress, records, workout)
+    with cols[2]:
+        show_chart(version, "muscle_volume", plot_weekly_muscle_volume, analysis['muscle_volume'])
+
+
+# The member's rank on each workout they have logged, and the top of a chosen board
+def render_leaderboards(ranks):
+    if not ranks:
+        return
+
+    cols = st.columns((.5, 3, .5))
+    with cols[1]:
+        st.write("<h4 style='color: #EB4034; text-align: center;'>Leaderboards</h4>", unsafe_allow_html=True)
+        st.dataframe(
+            pd.DataFrame(ranks, columns=['workoutname', 'best_score', 'gym_rank', 'gender_rank']),
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                "workoutname": st.column_config.Column("Workout Name", width="small"),
+                "best_score": st.column_config.NumberColumn("Best Strength Score", format="%.3f"),
+                "gym_rank": st.column_config.NumberColumn("Gym Rank"),
+                "gender_rank": st.column_config.NumberColumn("Gender Rank"),
+            }
+        )
+
+        workout = st.selectbox("Top 20 for", [row[0] for row in ranks], key="leaderboard_workout")
+        board = st.radio("Board", ["Everyone", "My Gender"], horizontal=True, key="leaderboard_board")
+        gender = st.session_state.get('gender') if board == "My Gender" else None
+        with rerun_stage("get_leaderboard"):
+            top = get_leaderboard(workout, gender)
+        top_df = pd.DataFrame(top, columns=['rank', 'userid', 'firstname', 'lastname', 'best_score'])
+        top_df['member'] = top_df['firstname'].fillna('') + ' ' + top_df['lastname'].fillna('').str[:1]
+        st.dataframe(
+            top_df[['rank', 'member', 'best_score']],
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                "rank": st.column_config.NumberColumn("Rank"),
+                "member": st.column_config.Column("Member"),
+                "best_score": st.column_config.NumberColumn("Strength Score", format="%.3f"),
+            }
+        )
+
+
+# Part of every rendered-chart cache key; change it when CHART_RC_PARAMS changes
+CHART_THEME = "dark"
+
+CHART_RC_PARAMS = {
+    'figure.facecolor': '#0E1118',
+    'axes.facecolor': '#0E1118',
+    'savefig.facecolor': '#0E1118',
+    'savefig.edgecolor': '#0E1118',
+    'text.color': 'white',
+    'axes.labelcolor': 'white',
+    'xtick.color': 'white',
+    'ytick.color': 'white',
+}
+
+
+# Set the chart theme on pyplot the first time a chart is drawn rather than at import
+@functools.cache
+def apply_chart_theme():
+    plt.rcParams.update(CHART_RC_PARAMS)
+
+# strength_scores holds distinct (workoutname, strength_score) points with the number of
+# sets that scored each, as returned by get_workout_analysis
+def plot_workout_strength_scores(strength_scores):
+    if strength_scores.empty:
         st.write("")
         st.write("")
         st.write("")
@@ -256,11 +447,14 @@ def plot_workout_strength_scores(workout_df):
         st.write("")
         return
 
-    workout_df = workout_df[workout_df['strength_score'] > 0]
-    workout_df['workoutname'] = pd.Categorical(
-        workout_df['workoutname'],
-        categories=workout_df.groupby('workoutname')['strength_score'].mean().sort_values(ascending=False).index
-    )
+    # Order workouts by their mean strength score over all sets
+    weighted = strength_scores['strength_score'] * strength_scores['sets']
+    mean_scores = (weighted.groupby(strength_scores['workoutname']).sum()
+                   / strength_scores.groupby('workoutname')['sets'].sum())
+    workout_df = strength_scores.assign(workoutname=pd.Categorical(
+        strength_scores['workoutname'],
+        categories=mean_scores.sort_values(ascending=False).index
+    ))
 
     plt.figure(figsize=(7,4), facecolor='#0E1118', edgecolor='#0E1118')
     sns.stripplot(x='workoutname', y='strength_score', data=workout_df, color='#EB4034', jitter=True)
@@ -315,4 +509,64 @@ def plot_muscle_group_bar_chart(muscle_group_counts):
     plt.ylabel('Count\n')
     plt.xticks(rotation=0)
 
-    return plt.gcf()
\ No newline at end of file
+    return plt.gcf()
+
+# Weekly best estimated one-rep max for one workout, with the running and rolling personal records
+def plot_one_rep_max_progress(records, workout):
+    plt.figure(figsize=(7,4), facecolor='#0E1118', edgecolor='#0E1118')
+    ax = plt.gca()
+    ax.plot(records['week'], records['best_e1rm'], 'o', color='#EB4034', label='Weekly Best')
+    ax.step(records['week'], records['pr_e1rm'], where='post', color='white', label='Personal Record')
+    ax.plot(records['week'], records['rolling_pr_e1rm'], '--', color='#888888', label='4-Week Best')
+    ax.legend(facecolor='#0E1118', edgecolor='#0E1118', labelcolor='white')
+
+    ax.set_facecolor('#0E1118')
+    ax.spines['top'].set_visible(False)
+    ax.spines['right'].set_visible(False)
+    ax.spines['bottom'].set_color('white')
+    ax.spines['left'].set_color('white')
+
+    ax.tick_params(axis='x', colors='white')
+    ax.tick_params(axis='y', colors='white')
+    ax.yaxis.label.set_color('white')
+    ax.xaxis.label.set_color('white')
+    ax.title.set_color('white')
+
+    plt.title(f'Estimated 1RM: {workout}')
+    plt.xlabel('\nWeek')
+    plt.ylabel('Estimated 1RM\n')
+    plt.gcf().autofmt_xdate()
+
+    return plt.gcf()
+
+# Stacked weekly training volume per muscle group over the last 12 logged weeks
+def plot_weekly_muscle_volume(muscle_volume):
+    if muscle_volume.empty:
+        return
+
+    weekly = muscle_volume.pivot_table(index='week', columns='muscle_group', values='volume',
+                                       aggfunc='sum', fill_value=0).tail(12)
+    weekly.index = weekly.index.strftime('%b %d')
+
+    plt.figure(figsize=(7,4), facecolor='#0E1118', edgecolor='#0E1118')
+    ax = weekly.plot(kind='bar', stacked=True, ax=plt.gca(), colormap='Reds')
+    ax.legend(facecolor='#0E1118', edgecolor='#0E1118', labelcolor='white', fontsize='small')
+
+    ax.set_facecolor('#0E1118')
+    ax.spines['top'].set_visible(False)
+    ax.spines['right'].set_visible(False)
+    ax.spines['bottom'].set_color('white')
+    ax.spines['left'].set_color('white')
+
+    ax.tick_params(axis='x', colors='white')
+    ax.tick_params(axis='y', colors='white')
+    ax.yaxis.label.set_color('white')
+    ax.xaxis.label.set_color('white')
+    ax.title.set_color('white')
+
+    plt.title('Weekly Volume by Muscle Group')
+    plt.xlabel('\nWeek Of')
+    plt.ylabel('Volume\n')
+    plt.xticks(rotation=0)
+
+    return plt.gcf()
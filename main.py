@@ -1,8 +1,9 @@
 # main.py
 import streamlit as st
 from utils.styles import inject_custom_styles
+from utils.db import start_metrics_server, start_journal_worker
+from utils.rerun_timing import rerun_timer
 from interfaces.authentication import render_auth_page
-from interfaces.dashboard import render_dashboard
 
 
 # Main application entry point. Configures the Streamlit page and manages authentication flow.
@@ -15,6 +16,12 @@ def main():
     
     # Apply custom styling
     inject_custom_styles()
+
+    # Start the /metrics endpoint and the worker that writes journaled workouts to the
+    # database (once per process). Schema changes are applied at deploy time, not here, so
+    # the app starts even while the database is unreachable.
+    start_metrics_server()
+    start_journal_worker()
     
     # Initialize session states
     if "logged_in" not in st.session_state:
@@ -29,11 +36,14 @@ def main():
         st.session_state.authentication_status = None  # Reset the flag
         st.session_state.logged_in = True
         
-    # Render appropriate view based on authentication state
-    if not st.session_state.logged_in:
-        render_auth_page()
-    else:
-        render_dashboard()
+    # Render appropriate view based on authentication state, timing each stage of the rerun
+    with rerun_timer():
+        if not st.session_state.logged_in:
+            render_auth_page()
+        else:
+            # Imported on first use so the login page loads without the plotting/analytics stack
+            from interfaces.dashboard import render_dashboard
+            render_dashboard()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
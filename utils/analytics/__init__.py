@@ -1,3 +1,3 @@
 from .metrics import (
-    calculate_user_metrics,
-)
\ No newline at end of file
+    compute_workout_metrics,
+)
@@ -0,0 +1,132 @@
+# utils/analytics/batch.py
+# Nightly batch analytics over every member. Worker processes each fetch a chunk of members'
+# histories in one columnar round trip and compute their metrics with compute_workout_metrics;
+# the parent streams the results into member_metrics_summary with COPY as chunks finish.
+#
+# Run from the repo root:  python -m utils.analytics.batch [--chunk-size N] [--workers N]
+# Each worker holds one database connection, plus one for the parent.
+import os
+import time
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from utils.db import get_db_connection, fetch_workout_columns, ensure_schema
+from utils.analytics.metrics import compute_workout_metrics
+
+
+# Members per worker task (one history fetch each)
+CHUNK_SIZE = int(os.getenv("BATCH_CHUNK_SIZE", "1000"))
+
+SUMMARY_COLUMNS = ['userid', 'total_workouts', 'weight_lifted', 'avg_weight', 'max_strength_score', 'training_volume']
+
+
+def none_if_nan(value):
+    value = float(value)
+    return None if np.isnan(value) else value
+
+
+# One member_metrics_summary row from a member's weight, sets and reps arrays
+def summarize_member(userid, user_weight, weightused, sets, reps):
+    # No strength score without a body weight to divide by
+    user_weight = float(user_weight) if user_weight else np.nan
+    metrics, columns = compute_workout_metrics(weightused, sets, reps, user_weight)
+    return (userid,
+            metrics['total_workouts'],
+            none_if_nan(metrics['weight_lifted']),
+            none_if_nan(metrics['avg_weight']),
+            none_if_nan(metrics['max_strength_score']),
+            none_if_nan(columns['training_volume'].sum()))
+
+
+# Worker task: summary rows for a chunk of (userid, weight) pairs, members without
+# workouts included
+def summarize_chunk(members):
+    _, columns = fetch_workout_columns([userid for userid, _ in members])
+
+    # Rows come back ordered by userid, so each member's sets are one contiguous slice
+    users, starts = np.unique(columns['userid'], return_index=True)
+    ends = np.append(starts[1:], len(columns['userid']))
+    spans = {int(userid): (start, end) for userid, start, end in zip(users, starts, ends)}
+
+    rows = []
+    for userid, user_weight in members:
+        start, end = spans.get(userid, (0, 0))
+        rows.append(summarize_member(
+            userid, user_weight,
+            columns['weightused'][start:end],
+            columns['setschosen'][start:end],
+            columns['repschosen'][start:end]))
+    return rows
+
+
+def get_members():
+    with get_db_connection() as conn, conn.cursor() as cur:
+        cur.execute("SELECT userid, weight FROM users ORDER BY userid")
+        return [(userid, float(weight) if weight is not None else None) for userid, weight in cur.fetchall()]
+
+
+# Recompute member_metrics_summary for every member. The table is replaced in one
+# transaction at the end, so reports never see a partial run.
+def run_batch_analytics(chunk_size=CHUNK_SIZE, workers=None, verbose=True):
+    ensure_schema()
+    start = time.perf_counter()
+    members = get_members()
+    chunks = [members[i:i + chunk_size] for i in range(0, len(members), chunk_size)]
+
+    summarized = 0
+    columns = ", ".join(SUMMARY_COLUMNS)
+    with get_db_connection() as conn, conn.cursor() as cur:
+        cur.execute("""
+            CREATE TEMP TABLE member_metrics_staging (
+                userid INTEGER, total_workouts BIGINT, weight_lifted DOUBLE PRECISION,
+                avg_weight DOUBLE PRECISION, max_strength_score DOUBLE PRECISION,
+                training_volume DOUBLE PRECISION
+            ) ON COMMIT DROP
+        """)
+
+        # Spawned workers start clean instead of inheriting this process's connection pool
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+            for rows in executor.map(summarize_chunk, chunks):
+                with cur.copy(f"COPY member_metrics_staging ({columns}) FROM STDIN") as copy:
+                    for row in rows:
+                        copy.write_row(row)
+                summarized += len(rows)
+                if verbose:
+                    elapsed = time.perf_counter() - start
+                    print(f"{summarized}/{len(members)} members, {summarized / elapsed:.0f} users/sec", flush=True)
+
+        cur.execute(f"""
+            INSERT INTO member_metrics_summary ({columns}, computed_at)
+            SELECT {columns}, now() FROM member_metrics_staging
+            ON CONFLICT (userid) DO UPDATE SET
+                total_workouts = EXCLUDED.total_workouts,
+                weight_lifted = EXCLUDED.weight_lifted,
+                avg_weight = EXCLUDED.avg_weight,
+                max_strength_score = EXCLUDED.max_strength_score,
+                training_volume = EXCLUDED.training_volume,
+                computed_at = EXCLUDED.computed_at
+        """)
+        # Members deleted since the last run
+        cur.execute("""
+            DELETE FROM member_metrics_summary s
+            WHERE NOT EXISTS (SELECT 1 FROM member_metrics_staging m WHERE m.userid = s.userid)
+        """)
+
+    elapsed = time.perf_counter() - start
+    rate = summarized / elapsed if elapsed else 0
+    return {
+        "success": True,
+        "message": f"Summarized {summarized} members in {elapsed:.1f}s ({rate:.0f} users/sec).",
+        "members": summarized,
+        "seconds": elapsed,
+        "users_per_second": rate,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recompute member_metrics_summary for every member.")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="members per worker task")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    args = parser.parse_args()
+    print(run_batch_analytics(args.chunk_size, args.workers)["message"])
@@ -1,30 +1,35 @@
 # utils/analytics_utils.py
-import pandas as pd
 import numpy as np
-from utils.db import format_workout_data
+from utils.db import BODYWEIGHT_FACTOR
 
-def calculate_user_metrics(workout_data, user_weight):
-    # Format raw data
-    workout_df = format_workout_data(workout_data)
-    
 
-    # Create adjusted_weight column
-    workout_df['adjusted_weight'] = workout_df['weightused'].astype(float)
-    workout_df.loc[workout_df['adjusted_weight'] == 0, 'adjusted_weight'] = 0.97 * user_weight
+# Vectorized metrics engine: one pass over contiguous arrays of weight, sets and reps.
+# Returns (metrics, columns) where columns holds the per-set arrays for the workout frame.
+def compute_workout_metrics(weightused, sets, reps, user_weight):
+    weight = np.asarray(weightused, dtype=np.float64)
+    sets = np.asarray(sets, dtype=np.float64)
+    reps = np.asarray(reps, dtype=np.float64)
+
+    # Explicit mask instead of comparing floats against 0.97 * user_weight. A NULL weight
+    # (NaN from the columnar fetch) is a bodyweight set, as COALESCE(weightused, 0) = 0 in SQL.
+    is_bodyweight = np.isnan(weight) | (weight == 0)
+    adjusted_weight = np.where(is_bodyweight, BODYWEIGHT_FACTOR * user_weight, weight)
+    training_volume = adjusted_weight * reps * sets
+    strength_score = np.round(training_volume / user_weight, 3)
+
+    loaded_sets = len(weight) - np.count_nonzero(is_bodyweight)
+    weight_lifted = np.nansum(weight)  # bodyweight sets contribute 0
 
-    # Calculate strength scores
-    workout_df['strength_score'] = (
-        (workout_df['adjusted_weight'] * workout_df['repschosen'] * workout_df['setschosen']) / user_weight).round(3)
-     
-     # Calculate training volume
-    workout_df['training_volume'] = workout_df['setschosen'] * workout_df['repschosen'] * workout_df['adjusted_weight']
-    
-    # Calculate metrics
     metrics = {
-        'total_workouts': len(workout_df),
-        'weight_lifted': workout_df[workout_df['adjusted_weight'] != 0.97 * user_weight]['weightused'].sum(),
-        'avg_weight': workout_df[workout_df['adjusted_weight'] != 0.97 * user_weight]['weightused'].mean(),
-        'max_strength_score': workout_df['strength_score'].max()
+        'total_workouts': len(weight),
+        'weight_lifted': weight_lifted,
+        'avg_weight': weight_lifted / loaded_sets if loaded_sets else np.nan,
+        'max_strength_score': np.nanmax(strength_score) if len(weight) else np.nan
+    }
+    columns = {
+        'is_bodyweight': is_bodyweight,
+        'adjusted_weight': adjusted_weight,
+        'strength_score': strength_score,
+        'training_volume': training_volume,
     }
-    
-    return metrics, workout_df
+    return metrics, columns
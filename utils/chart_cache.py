@@ -0,0 +1,70 @@
+# utils/chart_cache.py
+import io
+import os
+import threading
+import matplotlib.pyplot as plt
+from cachetools import LRUCache
+from prometheus_client import Counter, Gauge
+from utils.db import get_or_create_metric
+
+
+# Memory cap for rendered charts in each app process, in bytes of PNG data
+CHART_CACHE_BYTES = int(os.getenv("CHART_CACHE_BYTES", str(64 * 1024 * 1024)))
+
+# Same resolution and cropping st.pyplot uses
+CHART_DPI = 200
+
+CHART_CACHE_REQUESTS = get_or_create_metric(
+    Counter, "victorylap_chart_cache_requests", "Chart cache lookups", ["chart", "result"])
+CHART_CACHE_SIZE = get_or_create_metric(
+    Gauge, "victorylap_chart_cache_bytes", "PNG bytes held by the chart cache")
+
+
+# (userid, data version, chart, theme) -> PNG bytes, evicted least recently used first
+# once the total size passes CHART_CACHE_BYTES
+_charts = LRUCache(maxsize=CHART_CACHE_BYTES, getsizeof=len)
+_charts_lock = threading.Lock()
+
+
+# Render a figure to PNG and close it, so it doesn't stay in pyplot's figure registry
+def figure_to_png(fig):
+    try:
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format="png", dpi=CHART_DPI, bbox_inches="tight")
+        return buffer.getvalue()
+    finally:
+        plt.close(fig)
+
+
+# PNG bytes for a chart, rendered by calling render() only on a cache miss.
+# chart names the chart and anything else it is drawn from (e.g. ("progress", workoutname));
+# version must change whenever the user's data does. render returns a Figure, or None when
+# there is nothing to draw, which is not cached. Pass version=None to skip the cache.
+def get_chart_png(userid, version, chart, theme, render):
+    key = (userid, version, chart, theme)
+    label = chart[0] if isinstance(chart, tuple) else chart
+    if version is not None:
+        with _charts_lock:
+            png = _charts.get(key)
+        if png is not None:
+            CHART_CACHE_REQUESTS.labels(label, "hit").inc()
+            return png
+    CHART_CACHE_REQUESTS.labels(label, "miss").inc()
+
+    fig = render()
+    if fig is None:
+        return None
+    png = figure_to_png(fig)
+    if version is not None and len(png) <= CHART_CACHE_BYTES:
+        with _charts_lock:
+            _charts[key] = png
+            CHART_CACHE_SIZE.set(_charts.currsize)
+    return png
+
+
+# Drop one user's rendered charts, or everyone's
+def invalidate_charts(userid=None):
+    with _charts_lock:
+        for key in [key for key in _charts if userid is None or key[0] == userid]:
+            del _charts[key]
+        CHART_CACHE_SIZE.set(_charts.currsize)
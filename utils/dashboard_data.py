@@ -0,0 +1,29 @@
+# utils/dashboard_data.py
+from utils.db import load_dashboard_data
+
+
+# Dashboard data for one rerun, loaded on demand. Each tab asks for the parts its widgets
+# use (see utils.db.db_async.DASHBOARD_PARTS), and each part is fetched at most once per
+# rerun, so a tab that needs nothing from the database makes no queries.
+#
+#   data = DashboardData(userid, user_weight)
+#   data.prefetch('analysis', 'ranks')   # fetched concurrently
+#   data['analysis']                     # memoized
+class DashboardData:
+    def __init__(self, userid, user_weight):
+        self.userid = userid
+        self.user_weight = user_weight
+        self._parts = {}
+
+    # Fetch whichever of these parts haven't been loaded yet, concurrently
+    def prefetch(self, *parts):
+        missing = tuple(part for part in parts if part not in self._parts)
+        if missing:
+            self._parts.update(load_dashboard_data(self.userid, self.user_weight, missing))
+
+    def __getitem__(self, part):
+        self.prefetch(part)
+        return self._parts[part]
+
+    def __contains__(self, part):
+        return part in self._parts
@@ -1,12 +1,109 @@
-from .db_user_queries import (
+import importlib
+from .db_pool import (
     get_db_connection,
+    get_pool,
+    get_pool_stats,
+    close_pool,
+)
+from .db_instrumentation import (
+    instrument_query,
+    get_or_create_metric,
+    start_metrics_server,
+)
+from .db_schema import (
+    ensure_schema,
+)
+from .db_catalog import (
+    WorkoutCatalog,
+    get_catalog,
+    invalidate_catalog,
+)
+from .db_local_cache import (
+    invalidate_local_cache,
+)
+from .db_journal import (
+    enqueue_workout,
+    get_journal_status,
+    retry_failed_workouts,
+    discard_failed_workouts,
+    drain_journal,
+    start_journal_worker,
+)
+from .db_auth_queries import (
     check_user_exists,
     check_email_exists,
+    verify_password,
+    authenticate_user,
     create_user,
-    get_user_details,
-    get_workout_questions,
-    insert_workout_data,
-    get_muscle_groups,
-    get_equipment_list,
-    format_workout_data,
-)
\ No newline at end of file
+    EmailTakenError,
+)
+
+
+# Everything below needs NumPy, pandas or Streamlit's caching, so each module is imported the
+# first time one of its names is used (e.g. `from utils.db import get_workout_analysis`).
+# The login page only uses the names above and starts without the analytics stack.
+_LAZY_EXPORTS = {
+    '.db_user_queries': [
+        'import_member_roster',
+        'get_user_details',
+        'get_workout_questions',
+        'insert_workout_data',
+        'insert_workout_batch',
+        'resolve_workout_ids',
+        'get_muscle_group_ids',
+        'get_equipment_ids',
+        'get_muscle_groups',
+        'get_equipment_list',
+        'format_workout_data',
+    ],
+    '.db_columnar': [
+        'fetch_workout_columns',
+    ],
+    '.db_metrics_queries': [
+        'get_user_metric_totals',
+        'backfill_user_metrics',
+    ],
+    '.db_analysis_queries': [
+        'BODYWEIGHT_FACTOR',
+        'get_workout_analysis',
+        'invalidate_analysis',
+    ],
+    '.db_leaderboard_queries': [
+        'LEADERBOARD_SIZE',
+        'get_leaderboard',
+        'get_user_ranks',
+        'rebuild_leaderboards',
+    ],
+    '.db_async': [
+        'run_async',
+        'get_async_db_connection',
+        'get_async_pool_stats',
+        'close_async_pool',
+        'fetch_workout_columns_async',
+        'get_user_details_async',
+        'get_workout_questions_async',
+        'get_muscle_groups_async',
+        'get_equipment_list_async',
+        'get_user_metric_totals_async',
+        'insert_workout_data_async',
+        'get_workout_analysis_async',
+        'get_user_ranks_async',
+        'get_catalog_async',
+        'load_dashboard_data_async',
+        'load_dashboard_data',
+    ],
+}
+_LAZY_MODULES = {name: module for module, names in _LAZY_EXPORTS.items() for name in names}
+
+
+def __getattr__(name):
+    module = _LAZY_MODULES.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_MODULES))
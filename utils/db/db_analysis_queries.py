@@ -0,0 +1,202 @@
+# utils/db/db_analysis_queries.py
+import os
+import threading
+import pandas as pd
+from cachetools import LRUCache
+from .db_pool import get_db_connection
+from .db_instrumentation import instrument_query, count_query_error
+from .db_metrics_queries import get_user_metric_totals
+from .db_local_cache import MISSING, local_get, local_put
+
+
+# Bodyweight sets (logged with no weight) count as this fraction of the user's body weight
+BODYWEIGHT_FACTOR = 0.97
+
+# Each set with the strength score from utils.analytics.metrics, computed in Postgres:
+# adjusted weight is the weight used, or BODYWEIGHT_FACTOR * body weight for bodyweight sets
+SCORED_SETS = """
+    SELECT w.workoutname, a.adjusted_weight,
+           round((a.adjusted_weight * w.setschosen * w.repschosen
+                  / NULLIF(%(user_weight)s, 0))::numeric, 3)::float8 AS strength_score
+    FROM workoutquestions w
+    CROSS JOIN LATERAL (
+        SELECT CASE WHEN COALESCE(w.weightused, 0) = 0 THEN %(bodyweight_factor)s * %(user_weight)s
+                    ELSE w.weightused::float8 END AS adjusted_weight
+    ) a
+    WHERE w.userid = %(userid)s
+"""
+
+# Best strength score and heaviest adjusted weight per workout, strongest first
+WORKOUT_BESTS_QUERY = f"""
+    SELECT workoutname, MAX(strength_score), MAX(adjusted_weight)
+    FROM ({SCORED_SETS}) s
+    WHERE strength_score > 0
+    GROUP BY workoutname
+    ORDER BY 2 DESC, workoutname
+"""
+
+# Distinct (workout, strength score) points with how many sets scored each
+STRENGTH_SCORES_QUERY = f"""
+    SELECT workoutname, strength_score, COUNT(*)
+    FROM ({SCORED_SETS}) s
+    WHERE strength_score > 0
+    GROUP BY workoutname, strength_score
+"""
+
+# Sets per muscle group, most trained first
+MUSCLE_GROUP_COUNTS_QUERY = """
+    SELECT m.musclename, COUNT(*)
+    FROM workoutquestions w
+    JOIN musclegroup m ON m.muscleid = w.muscleid
+    WHERE w.userid = %(userid)s
+    GROUP BY m.musclename
+    ORDER BY 2 DESC, m.musclename
+"""
+
+# Weekly best estimated one-rep max, volume and sets per workout, from the trigger-maintained
+# weekly_workout_progress table (one row per workout per week, however many sets were logged)
+WEEKLY_PROGRESS_QUERY = """
+    SELECT week, workoutname, best_e1rm, volume, sets
+    FROM weekly_workout_progress
+    WHERE userid = %(userid)s
+    ORDER BY workoutname, week
+"""
+
+# Weekly volume and sets per muscle group, from weekly_muscle_volume
+WEEKLY_MUSCLE_VOLUME_QUERY = """
+    SELECT v.week, m.musclename, v.volume, v.sets
+    FROM weekly_muscle_volume v
+    JOIN musclegroup m ON m.muscleid = v.muscleid
+    WHERE v.userid = %(userid)s
+    ORDER BY v.week, m.musclename
+"""
+
+# Queries behind get_workout_analysis, in workout_analysis_from_rows argument order
+ANALYSIS_QUERIES = (WORKOUT_BESTS_QUERY, STRENGTH_SCORES_QUERY, MUSCLE_GROUP_COUNTS_QUERY,
+                    WEEKLY_PROGRESS_QUERY, WEEKLY_MUSCLE_VOLUME_QUERY)
+
+# Number of users whose analysis is kept in memory per process
+ANALYSIS_CACHE_SIZE = int(os.getenv("ANALYSIS_CACHE_SIZE", "1000"))
+
+# Window for the rolling personal record: the best estimated one-rep max over the last 4 weeks
+ROLLING_PR_WINDOW = '28D'
+
+
+def analysis_params(userid, user_weight):
+    return {'userid': userid, 'user_weight': float(user_weight), 'bodyweight_factor': BODYWEIGHT_FACTOR}
+
+
+# Add the running personal record, rolling personal record and PR flag to the weekly progress.
+# Rows arrive ordered by workoutname, then week. Only a handful per workout reach here, so this is cheap however long the history is.
+def progression_from_rows(rows):
+    progress = pd.DataFrame(rows, columns=['week', 'workoutname', 'best_e1rm', 'volume', 'sets']).astype(
+        {'week': 'datetime64[ns]', 'best_e1rm': 'float64', 'volume': 'float64', 'sets': 'int64'})
+    by_workout = progress.groupby('workoutname', sort=False)['best_e1rm']
+    progress['pr_e1rm'] = by_workout.cummax()
+    previous_pr = progress.groupby('workoutname', sort=False)['pr_e1rm'].shift()
+    progress['is_pr'] = previous_pr.isna() | (progress['best_e1rm'] > previous_pr)
+    progress['rolling_pr_e1rm'] = (
+        progress.set_index('week').groupby('workoutname', sort=False)['best_e1rm']
+        .rolling(ROLLING_PR_WINDOW).max().to_numpy())
+    return progress
+
+
+# Build the analysis result from the ANALYSIS_QUERIES results
+def workout_analysis_from_rows(bests, scores, muscle_counts, progress, muscle_volume):
+    muscle_volume = pd.DataFrame(muscle_volume, columns=['week', 'muscle_group', 'volume', 'sets']).astype(
+        {'week': 'datetime64[ns]', 'volume': 'float64', 'sets': 'int64'})
+    return {
+        'workout_bests': pd.DataFrame(bests, columns=['workoutname', 'max_strength_score', 'max_weight_lifted']),
+        'strength_scores': pd.DataFrame(scores, columns=['workoutname', 'strength_score', 'sets']),
+        'muscle_group_counts': pd.Series(
+            [count for _, count in muscle_counts],
+            index=pd.Index([name for name, _ in muscle_counts], name='muscle_group'),
+            name='count', dtype='int64'),
+        'progress': progression_from_rows(progress),
+        'muscle_volume': muscle_volume,
+    }
+
+
+def empty_workout_analysis():
+    return workout_analysis_from_rows([], [], [], [], [])
+
+
+# userid -> (key, analysis). The key is the user's weight plus the user_metrics row count and
+# updated_at, which the workoutquestions triggers change on every insert, update and delete.
+# Analyses are also kept in the local cache under the same key, so other processes on the
+# host, and this one after a restart, don't have to recompute them.
+_analysis = LRUCache(maxsize=ANALYSIS_CACHE_SIZE)
+_analysis_lock = threading.Lock()
+
+
+def analysis_cache_key(user_weight, metric_totals):
+    return (float(user_weight), metric_totals['total_workouts'], metric_totals['updated_at'])
+
+
+def get_cached_analysis(userid, key):
+    with _analysis_lock:
+        cached = _analysis.get(userid)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+
+    # The key is the data version, so a local entry with the same key never goes stale
+    analysis = local_get(userid, 'analysis', key, max_age=float('inf'))
+    if analysis is MISSING:
+        return None
+    with _analysis_lock:
+        _analysis[userid] = (key, analysis)
+    return analysis
+
+
+def store_analysis(userid, key, analysis):
+    with _analysis_lock:
+        _analysis[userid] = (key, analysis)
+    local_put(userid, 'analysis', analysis, key)
+
+
+# Drop one user's cached analysis, or everyone's
+def invalidate_analysis(userid=None):
+    with _analysis_lock:
+        if userid is None:
+            _analysis.clear()
+        else:
+            _analysis.pop(userid, None)
+
+
+# View Data aggregates computed in Postgres, so only a few dozen rows are transferred:
+#   workout_bests        DataFrame of workoutname, max_strength_score, max_weight_lifted
+#   strength_scores      DataFrame of distinct workoutname, strength_score points and their set counts
+#   muscle_group_counts  Series of set counts indexed by muscle group
+#   progress             DataFrame of week, workoutname, best_e1rm, volume, sets, pr_e1rm (running
+#                        personal record), is_pr and rolling_pr_e1rm (best over ROLLING_PR_WINDOW)
+#   muscle_volume        DataFrame of week, muscle_group, volume, sets
+# Results are cached until the user's trigger-maintained totals change. Pass metric_totals
+# from get_user_metric_totals if they are already loaded. The frames are shared; don't modify them.
+# If the queries fail, an empty analysis is returned and nothing is cached.
+@instrument_query
+def get_workout_analysis(userid, user_weight, metric_totals=None):
+    if metric_totals is None:
+        metric_totals = get_user_metric_totals(userid)
+    if metric_totals is None:
+        return empty_workout_analysis()
+
+    key = analysis_cache_key(user_weight, metric_totals)
+    analysis = get_cached_analysis(userid, key)
+    if analysis is not None:
+        return analysis
+
+    params = analysis_params(userid, user_weight)
+    try:
+        with get_db_connection() as conn, conn.cursor() as cur:
+            results = []
+            for query in ANALYSIS_QUERIES:
+                cur.execute(query, params)
+                results.append(cur.fetchall())
+    except Exception as e:
+        count_query_error("get_workout_analysis")
+        print(f"Error fetching workout analysis: {e}")
+        return empty_workout_analysis()
+
+    analysis = workout_analysis_from_rows(*results)
+    store_analysis(userid, key, analysis)
+    return analysis
@@ -0,0 +1,348 @@
+# utils/db/db_async.py
+import os
+import time
+import atexit
+import asyncio
+import threading
+from contextlib import asynccontextmanager
+from psycopg_pool import AsyncConnectionPool, PoolTimeout
+from .db_pool import (
+    POOL_MIN_SIZE,
+    ASYNC_POOL_MAX_SIZE,
+    POOL_TIMEOUT,
+    POOL_MAX_IDLE,
+    POOL_MAX_LIFETIME,
+    record_acquire,
+    record_acquire_timeout,
+    get_acquire_stats,
+    describe_pool,
+)
+from .db_metrics_queries import metric_totals_from_row
+from .db_user_queries import WORKOUT_QUESTIONS_QUERY
+from .db_columnar import WORKOUT_COLUMNS_QUERY, workout_columns_from_row
+from .db_leaderboard_queries import USER_RANKS_QUERY
+from .db_analysis_queries import (
+    ANALYSIS_QUERIES,
+    analysis_params,
+    analysis_cache_key,
+    get_cached_analysis,
+    store_analysis,
+    workout_analysis_from_rows,
+    empty_workout_analysis,
+)
+from .db_instrumentation import instrument_query, count_query_error
+from .db_local_cache import local_cached, invalidate_local_cache
+from .db_catalog import (
+    CATALOG_VERSION_QUERY,
+    CATALOG_QUERIES,
+    WorkoutCatalog,
+    fresh_catalog,
+    cached_catalog,
+    store_catalog,
+)
+
+
+# Async pools are bound to the event loop that opened them, and every Streamlit
+# rerun runs in its own script thread. So one background thread per process owns
+# the loop and the pool, and sync code hands coroutines to it with run_async().
+_loop = None
+_loop_lock = threading.Lock()
+
+_async_pool = None
+_async_pool_lock = None
+
+
+def get_event_loop():
+    global _loop
+    if _loop is None:
+        with _loop_lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="victorylap-db-async", daemon=True).start()
+                _loop = loop
+    return _loop
+
+
+# Run a coroutine on the background loop and wait for its result
+def run_async(coro, timeout=None):
+    return asyncio.run_coroutine_threadsafe(coro, get_event_loop()).result(timeout)
+
+
+# Create the process-wide async pool on first use (runs on the background loop)
+async def get_async_pool():
+    global _async_pool, _async_pool_lock
+    if _async_pool is None:
+        if _async_pool_lock is None:
+            _async_pool_lock = asyncio.Lock()
+        async with _async_pool_lock:
+            if _async_pool is None:
+                database_url = os.getenv("DATABASE_URL")
+                if not database_url:
+                    raise ValueError("DATABASE_URL is not set in .env")
+                pool = AsyncConnectionPool(
+                    conninfo=database_url,
+                    min_size=min(POOL_MIN_SIZE, ASYNC_POOL_MAX_SIZE),
+                    max_size=ASYNC_POOL_MAX_SIZE,
+                    timeout=POOL_TIMEOUT,
+                    max_idle=POOL_MAX_IDLE,
+                    max_lifetime=POOL_MAX_LIFETIME,
+                    # Health check every connection before handing it out
+                    check=AsyncConnectionPool.check_connection,
+                    name="victorylap-async",
+                    open=False,
+                )
+                await pool.open()
+                _async_pool = pool
+                atexit.register(close_async_pool)
+    return _async_pool
+
+
+# Close the async pool and stop the background loop (registered at exit)
+def close_async_pool():
+    global _async_pool, _async_pool_lock, _loop
+    if _loop is None:
+        return
+    if _async_pool is not None:
+        run_async(_async_pool.close())
+        _async_pool = None
+    _async_pool_lock = None
+    _loop.call_soon_threadsafe(_loop.stop)
+    _loop = None
+
+
+# Async counterpart of get_db_connection: commits on success, rolls back on error
+@asynccontextmanager
+async def get_async_db_connection(timeout=None):
+    pool = await get_async_pool()
+    start = time.perf_counter()
+    try:
+        conn = await pool.getconn(timeout=timeout)
+    except PoolTimeout:
+        record_acquire_timeout()
+        raise
+    record_acquire((time.perf_counter() - start) * 1000)
+
+    try:
+        async with conn:
+            yield conn
+    finally:
+        await pool.putconn(conn)
+
+
+# Pool usage for the async pool, same shape as get_pool_stats
+def get_async_pool_stats():
+    acquire = get_acquire_stats()
+    if _async_pool is None:
+        return {'open': False, 'in_use': 0, 'idle': 0, 'waiting': 0, 'size': 0,
+                'min_size': POOL_MIN_SIZE, 'max_size': ASYNC_POOL_MAX_SIZE, 'acquire': acquire}
+    return describe_pool(_async_pool, acquire)
+
+
+@instrument_query
+async def get_user_details_async(email):
+    try:
+        async with get_async_db_connection() as conn, conn.cursor() as cur:
+            await cur.execute(
+                """
+                SELECT u.userid, u.firstname, u.lastname, u.gender, u.weight
+                FROM users u
+                JOIN "User" usr ON u.userid = usr.id
+                WHERE usr.email = %s
+                """,
+                (email,)
+            )
+            return await cur.fetchone()
+    except Exception as e:
+        count_query_error("get_user_details_async")
+        print(f"Error fetching user details: {e}")
+        return None
+
+
+# Async fetch_workout_columns
+@instrument_query
+async def fetch_workout_columns_async(userids):
+    async with get_async_db_connection() as conn, conn.cursor(binary=True) as cur:
+        await cur.execute(WORKOUT_COLUMNS_QUERY, {'userids': [int(userid) for userid in userids]})
+        return workout_columns_from_row(await cur.fetchone())
+
+
+# Async get_workout_questions
+@instrument_query
+async def get_workout_questions_async(userid):
+    try:
+        async with get_async_db_connection() as conn, conn.cursor() as cur:
+            await cur.execute(WORKOUT_QUESTIONS_QUERY, (userid,))
+            return await cur.fetchall()
+    except Exception as e:
+        count_query_error("get_workout_questions_async")
+        print(f"Error fetching workout data: {e}")
+        return []
+
+
+# Async get_catalog; shares the process's catalog with the sync version
+async def get_catalog_async(check=False):
+    catalog = None if check else fresh_catalog()
+    if catalog is not None:
+        return catalog
+    try:
+        async with get_async_db_connection() as conn, conn.cursor() as cur:
+            await cur.execute(CATALOG_VERSION_QUERY)
+            version = (await cur.fetchone())[0]
+            catalog = cached_catalog()
+            if catalog is None or catalog.version != version:
+                results = []
+                for query in CATALOG_QUERIES:
+                    await cur.execute(query)
+                    results.append(await cur.fetchall())
+                catalog = WorkoutCatalog(version, *results)
+    except Exception as e:
+        catalog = cached_catalog()
+        if catalog is None:
+            raise
+        count_query_error("get_catalog_async")
+        print(f"Error checking the workout catalog: {e}")
+    store_catalog(catalog)
+    return catalog
+
+
+@instrument_query
+async def get_muscle_groups_async():
+    return (await get_catalog_async()).muscle_groups
+
+
+@instrument_query
+async def get_equipment_list_async():
+    return (await get_catalog_async()).equipment_list
+
+
+@instrument_query
+@local_cached('metric_totals')
+async def get_user_metric_totals_async(userid):
+    try:
+        async with get_async_db_connection() as conn, conn.cursor() as cur:
+            await cur.execute("""
+                SELECT total_workouts, weighted_sets, weight_lifted::float8,
+                       max_weighted_volume::float8, max_bodyweight_volume::float8, updated_at
+                FROM user_metrics
+                WHERE userid = %s
+            """, (userid,))
+            row = await cur.fetchone()
+    except Exception as e:
+        count_query_error("get_user_metric_totals_async")
+        print(f"Error fetching user metrics: {e}")
+        return None
+    return metric_totals_from_row(row)
+
+
+@instrument_query
+async def insert_workout_data_async(userid, workout_name, muscle_group, equipment, weight_used, sets, reps):
+    catalog = await get_catalog_async()
+    if muscle_group not in catalog.muscle_ids or equipment not in catalog.equipment_ids:
+        # The catalog may have changed since it was last checked
+        catalog = await get_catalog_async(check=True)
+    try:
+        muscleid, equipmentid = catalog.resolve_ids(muscle_group, equipment)
+    except LookupError as e:
+        return {"success": False, "error": str(e)}
+
+    try:
+        async with get_async_db_connection() as conn, conn.cursor() as cur:
+            await cur.execute("""
+                INSERT INTO workoutquestions (userid, workoutname, muscleid, equipmentid, weightused, setschosen, repschosen)
+                VALUES (%s, %s, %s, %s, %s, %s, %s)
+            """, (userid, workout_name, muscleid, equipmentid, weight_used, sets, reps))
+
+        await asyncio.to_thread(invalidate_local_cache, userid)
+        return {"success": True, "message": "Workout data inserted successfully."}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+
+# Async get_user_ranks; [] if the query fails
+@instrument_query
+async def get_user_ranks_async(userid):
+    ranks = await _fetch_user_ranks_async(userid)
+    return ranks if ranks is not None else []
+
+
+# None when the query fails, so the failure isn't stored in the local cache
+@local_cached('ranks')
+async def _fetch_user_ranks_async(userid):
+    try:
+        async with get_async_db_connection() as conn, conn.cursor() as cur:
+            await cur.execute(USER_RANKS_QUERY, (userid,))
+            return await cur.fetchall()
+    except Exception as e:
+        count_query_error("get_user_ranks_async")
+        print(f"Error fetching leaderboard ranks: {e}")
+        return None
+
+
+# Async get_workout_analysis. The aggregate queries are pipelined on one connection, so they
+# cost one round trip without taking a connection each. An empty analysis is returned (and
+# not cached) if they fail.
+@instrument_query
+async def get_workout_analysis_async(userid, user_weight, metric_totals=None):
+    if metric_totals is None:
+        metric_totals = await get_user_metric_totals_async(userid)
+    if metric_totals is None:
+        return empty_workout_analysis()
+
+    # The cache helpers read and write the local cache file, so they run off the event loop
+    key = analysis_cache_key(user_weight, metric_totals)
+    analysis = await asyncio.to_thread(get_cached_analysis, userid, key)
+    if analysis is not None:
+        return analysis
+
+    params = analysis_params(userid, user_weight)
+    try:
+        async with get_async_db_connection() as conn, conn.pipeline():
+            cursors = [conn.cursor() for _ in ANALYSIS_QUERIES]
+            for cur, query in zip(cursors, ANALYSIS_QUERIES):
+                await cur.execute(query, params)
+            results = [await cur.fetchall() for cur in cursors]
+    except Exception as e:
+        count_query_error("get_workout_analysis_async")
+        print(f"Error fetching workout analysis: {e}")
+        return empty_workout_analysis()
+    analysis = workout_analysis_from_rows(*results)
+    await asyncio.to_thread(store_analysis, userid, key, analysis)
+    return analysis
+
+
+# Parts of the dashboard data load_dashboard_data can fetch
+DASHBOARD_PARTS = ('muscle_groups', 'equipment_list', 'metric_totals', 'analysis', 'analysis_version', 'ranks')
+
+
+# The requested dashboard parts (all by default), fetched concurrently so the page waits for
+# the slowest query rather than the sum of them. The workout analysis depends on the totals,
+# so it follows them once they arrive (and is empty without user_weight). analysis_version
+# changes whenever the analysis does, for caching anything derived from it.
+async def load_dashboard_data_async(userid, user_weight=None, parts=DASHBOARD_PARTS):
+    unknown = set(parts) - set(DASHBOARD_PARTS)
+    if unknown:
+        raise ValueError(f"Unknown dashboard parts: {sorted(unknown)}")
+    wants_analysis = 'analysis' in parts or 'analysis_version' in parts
+
+    loaders = {
+        'muscle_groups': get_muscle_groups_async,
+        'equipment_list': get_equipment_list_async,
+        'metric_totals': lambda: get_user_metric_totals_async(userid),
+        'ranks': lambda: get_user_ranks_async(userid),
+    }
+    names = [name for name in loaders
+             if name in parts or (name == 'metric_totals' and wants_analysis)]
+    data = dict(zip(names, await asyncio.gather(*(loaders[name]() for name in names))))
+
+    if wants_analysis:
+        data['analysis'], data['analysis_version'] = empty_workout_analysis(), None
+        if user_weight is not None:
+            data['analysis'] = await get_workout_analysis_async(userid, user_weight, data['metric_totals'])
+            if data['metric_totals'] is not None:
+                data['analysis_version'] = analysis_cache_key(user_weight, data['metric_totals'])
+    return {name: data[name] for name in parts}
+
+
+# Sync entry point for Streamlit code
+def load_dashboard_data(userid, user_weight=None, parts=DASHBOARD_PARTS):
+    return run_async(load_dashboard_data_async(userid, user_weight, parts))
@@ -0,0 +1,106 @@
+# utils/db/db_auth_queries.py
+# Account queries used by the login page. Kept free of NumPy/pandas so the login page
+# starts without the analytics stack.
+import bcrypt
+from .db_pool import get_db_connection
+from .db_instrumentation import instrument_query
+
+
+# Raised by create_user when the email already belongs to an account
+class EmailTakenError(ValueError):
+    pass
+
+
+# Check if a user exists. If password is provided, also verify credentials.
+@instrument_query
+def check_user_exists(email, password = None):
+
+    with get_db_connection() as conn, conn.cursor() as cur:
+        if password is None:
+            # Just check if email exists
+            cur.execute('SELECT EXISTS(SELECT 1 FROM "User" WHERE email = %s)', (email,))
+            return cur.fetchone()[0]
+
+        # Check email and password
+        cur.execute('SELECT password FROM "User" WHERE email = %s', (email,))
+        result = cur.fetchone()
+
+    # Verify outside the connection block so bcrypt doesn't hold a pooled connection
+    if result:
+        return verify_password(password, result[0])
+    return False
+
+
+# Check a plaintext password against the stored bcrypt hash
+def verify_password(password, stored_password):
+    # stored_password should be the bcrypt hash as a string
+    if stored_password.startswith("\\x"):
+        # If the hash is in hexadecimal format, decode it back to bytes
+        stored_password = stored_password[2:]  # Remove '\\x'
+        stored_password = bytes.fromhex(stored_password)
+
+    # Ensure password is encoded before checking
+    return bcrypt.checkpw(password.encode('utf-8'), stored_password.encode('utf-8') if isinstance(stored_password, str) else stored_password)
+
+
+# Log in with one query: fetch the hash and the profile together, then verify.
+# Returns (authenticated, user_details); user_details has the get_user_details shape
+# and is None if the account has no profile row.
+@instrument_query
+def authenticate_user(email, password):
+    with get_db_connection() as conn, conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT usr.password, u.userid, u.firstname, u.lastname, u.gender, u.weight
+            FROM "User" usr
+            LEFT JOIN users u ON u.userid = usr.id
+            WHERE usr.email = %s
+            """,
+            (email,)
+        )
+        result = cur.fetchone()
+
+    if result is None or not verify_password(password, result[0]):
+        return False, None
+
+    user_details = result[1:]
+    if user_details[0] is None:
+        return True, None
+    return True, user_details
+
+
+# Alias for check_user_exists(email) for backwards compatibility
+def check_email_exists(email: str) -> bool:
+
+    return check_user_exists(email)
+
+
+@instrument_query
+def create_user(firstname, lastname, email, password, gender, weight):
+    # Hash the password before borrowing a connection
+    hashed_password = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
+
+    # One transaction on one connection: commits on success, rolls back if anything raises
+    with get_db_connection() as conn, conn.cursor() as cur:
+        # The unique index on email decides whether the address is taken
+        cur.execute(
+            """
+            INSERT INTO "User" (email, password) VALUES (%s, %s)
+            ON CONFLICT (email) DO NOTHING
+            RETURNING id
+            """,
+            (email, hashed_password))
+        row = cur.fetchone()
+        if row is None:
+            raise EmailTakenError("Email already exists")
+        user_id = row[0]  # Get the user id after creation
+
+        # Link the profile row to the account by its id
+        cur.execute(
+            """
+            INSERT INTO users (userid, firstname, lastname, gender, weight) 
+            VALUES (%s, %s, %s, %s, %s)
+            """,
+            (user_id, firstname, lastname, gender, weight))
+
+    return user_id  # Return the user id
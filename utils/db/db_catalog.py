@@ -0,0 +1,199 @@
+# utils/db/db_catalog.py
+import os
+import time
+import threading
+from .db_pool import get_db_connection
+from .db_instrumentation import instrument_query, count_query_error
+
+
+# Seconds a process trusts its catalog before checking catalog_version again
+CATALOG_CHECK_SECONDS = float(os.getenv("CATALOG_CHECK_SECONDS", "5"))
+
+# Equipment for workouts with no workout_equipment rows
+DEFAULT_EQUIPMENT = ("None",)
+
+CATALOG_VERSION_QUERY = "SELECT version FROM catalog_version"
+
+# Queries behind a WorkoutCatalog, in constructor argument order
+CATALOG_QUERIES = (
+    "SELECT muscleid, musclename FROM musclegroup ORDER BY muscleid",
+    "SELECT equipmentid, equipmentname FROM equipment ORDER BY equipmentid",
+    """
+    SELECT c.category, m.musclename
+    FROM muscle_categories c
+    JOIN musclegroup m ON m.muscleid = c.muscleid
+    ORDER BY c.position, m.musclename
+    """,
+    """
+    SELECT m.musclename, w.workoutname
+    FROM workout_muscles w
+    JOIN musclegroup m ON m.muscleid = w.muscleid
+    ORDER BY w.muscleid, w.position, w.workoutname
+    """,
+    """
+    SELECT w.workoutname, e.equipmentname
+    FROM workout_equipment w
+    JOIN equipment e ON e.equipmentid = w.equipmentid
+    ORDER BY w.workoutname, w.position, e.equipmentname
+    """,
+)
+
+
+# Group (key, value) rows into key -> tuple of values, keeping row order
+def _group(rows):
+    grouped = {}
+    for key, value in rows:
+        grouped.setdefault(key, []).append(value)
+    return {key: tuple(values) for key, values in grouped.items()}
+
+
+# One version of the workout catalog with every lookup precomputed. Instances are
+# immutable snapshots shared between threads; get_catalog() swaps in a new one when
+# catalog_version changes.
+#   muscle_groups / equipment_list   (id, name) rows, as get_muscle_groups/get_equipment_list return
+#   muscle_ids / muscle_names        name <-> id (likewise equipment_ids / equipment_names)
+#   categories                       broad category -> muscle groups
+#   muscle_workouts                  muscle group -> workouts
+#   workout_muscles                  workout -> muscle groups
+#   workout_equipment                workout -> equipment
+#   equipment_workouts               equipment -> workouts
+#   option_tree                      broad category -> muscle group -> workout -> equipment
+class WorkoutCatalog:
+    def __init__(self, version, muscle_groups, equipment_list, categories, muscle_workouts, workout_equipment):
+        self.version = version
+        self.muscle_groups = [tuple(row) for row in muscle_groups]
+        self.equipment_list = [tuple(row) for row in equipment_list]
+        self.muscle_ids = {name: muscleid for muscleid, name in self.muscle_groups}
+        self.muscle_names = {muscleid: name for muscleid, name in self.muscle_groups}
+        self.equipment_ids = {name: equipmentid for equipmentid, name in self.equipment_list}
+        self.equipment_names = {equipmentid: name for equipmentid, name in self.equipment_list}
+
+        self.categories = _group(categories)
+        self.muscle_workouts = _group(muscle_workouts)
+        self.workout_muscles = _group((workout, muscle) for muscle, workout in muscle_workouts)
+        explicit_equipment = _group(workout_equipment)
+        self.workout_equipment = {
+            workout: explicit_equipment.get(workout, DEFAULT_EQUIPMENT) for workout in self.workout_muscles}
+        self.equipment_workouts = _group(
+            (equipment, workout)
+            for workout, equipment_options in sorted(self.workout_equipment.items())
+            for equipment in equipment_options)
+
+        self.option_tree = {
+            category: {
+                muscle: {
+                    workout: self.workout_equipment[workout]
+                    for workout in self.muscle_workouts.get(muscle, ())
+                }
+                for muscle in muscles
+            }
+            for category, muscles in self.categories.items()
+        }
+
+    # Muscle group and equipment ids for their names. Raises LookupError for unknown names.
+    def resolve_ids(self, muscle_group, equipment):
+        if muscle_group not in self.muscle_ids:
+            raise LookupError(f"No muscleid found for muscle_group: {muscle_group}")
+        if equipment not in self.equipment_ids:
+            raise LookupError(f"No equipmentid found for equipment: {equipment}")
+        return self.muscle_ids[muscle_group], self.equipment_ids[equipment]
+
+
+# The process's catalog, when its version was last confirmed and when a check last failed
+# (time.monotonic()). _catalog_lock is held by the one thread checking the version.
+_catalog = None
+_checked_at = 0.0
+_failed_at = None
+_catalog_lock = threading.Lock()
+
+
+# The current catalog if it was confirmed within CATALOG_CHECK_SECONDS, else None
+def fresh_catalog():
+    if _catalog is not None and time.monotonic() - _checked_at < CATALOG_CHECK_SECONDS:
+        return _catalog
+    return None
+
+
+def cached_catalog():
+    return _catalog
+
+
+# Record a catalog (or that the cached one is still current) as confirmed just now
+def store_catalog(catalog):
+    global _catalog, _checked_at
+    _catalog = catalog
+    _checked_at = time.monotonic()
+
+
+# Drop the catalog so the next lookup reloads it
+def invalidate_catalog():
+    global _catalog, _checked_at, _failed_at
+    with _catalog_lock:
+        _catalog = None
+        _checked_at = 0.0
+        _failed_at = None
+
+
+@instrument_query
+def load_catalog(cur):
+    cur.execute(CATALOG_VERSION_QUERY)
+    version = cur.fetchone()[0]
+    if _catalog is not None and _catalog.version == version:
+        return _catalog
+    # Read the version first: if the catalog changes mid-load, the next check reloads it
+    results = []
+    for query in CATALOG_QUERIES:
+        cur.execute(query)
+        results.append(cur.fetchall())
+    return WorkoutCatalog(version, *results)
+
+
+# The workout catalog, loaded once per process. Its version is checked at most every
+# CATALOG_CHECK_SECONDS (one single-row query), and the catalog is reloaded only when the
+# version has changed. Pass check=True to check now, e.g. after a lookup misses. If the check
+# fails the last loaded catalog is used, and checks (forced or not) wait CATALOG_CHECK_SECONDS.
+# Once a catalog is loaded, plain lookups never wait for another thread's check, so a check
+# stalled on an unreachable database doesn't hold them up.
+def get_catalog(check=False):
+    global _failed_at
+    catalog = None if check else fresh_catalog()
+    if catalog is not None:
+        return catalog
+
+    catalog = cached_catalog()
+    if catalog is not None and not check:
+        if not _catalog_lock.acquire(blocking=False):
+            return catalog
+    else:
+        _catalog_lock.acquire()
+    try:
+        catalog = None if check else fresh_catalog()
+        if catalog is not None:
+            return catalog
+        if _catalog is not None and _failed_at is not None and (
+                time.monotonic() - _failed_at < CATALOG_CHECK_SECONDS):
+            return _catalog
+        try:
+            with get_db_connection() as conn, conn.cursor() as cur:
+                catalog = load_catalog(cur)
+            _failed_at = None
+        except Exception as e:
+            if _catalog is None:
+                raise
+            count_query_error("get_catalog")
+            print(f"Error checking the workout catalog: {e}")
+            catalog = _catalog
+            _failed_at = time.monotonic()
+        store_catalog(catalog)
+        return catalog
+    finally:
+        _catalog_lock.release()
+
+
+# Catalog lookup that refreshes once if a name is unknown, since the catalog may have
+# changed since it was last checked
+def resolve_catalog_ids(muscle_group, equipment):
+    catalog = get_catalog()
+    if muscle_group not in catalog.muscle_ids or equipment not in catalog.equipment_ids:
+        catalog = get_catalog(check=True)
+    return catalog.resolve_ids(muscle_group, equipment)
@@ -0,0 +1,85 @@
+# utils/db/db_columnar.py
+import numpy as np
+from .db_pool import get_db_connection
+from .db_instrumentation import instrument_query
+
+
+# Columns fetched for the columnar path and their Postgres binary element types.
+# Every value is cast to a fixed width and NULLs are replaced, so each column can be read
+# with one np.frombuffer. workoutname is sent as its code in the sorted name dictionary.
+COLUMNAR_FIELDS = [
+    ('userid', '>i4'),
+    ('workoutname', '>i4'),
+    ('muscleid', '>i4'),
+    ('equipmentid', '>i4'),
+    ('weightused', '>f8'),
+    ('setschosen', '>i4'),
+    ('repschosen', '>i4'),
+]
+
+
+# Decode the binary form of a one-dimensional array without NULLs (array_send output):
+# ndim, has-null flag and element oid, then (size, lower bound) per dimension, then a
+# (length, value) pair per element
+def parse_array_send(data, element_dtype):
+    element_dtype = np.dtype(element_dtype)
+    if data is None:
+        return np.empty(0, dtype=element_dtype.newbyteorder('='))
+    data = memoryview(data)
+    ndim = int.from_bytes(data[0:4], 'big', signed=True)
+    if ndim == 0:
+        return np.empty(0, dtype=element_dtype.newbyteorder('='))
+    if ndim != 1:
+        raise ValueError(f"Expected a one-dimensional array, got {ndim} dimensions")
+    if int.from_bytes(data[4:8], 'big'):
+        raise ValueError("Array contains NULLs")
+
+    pairs = np.frombuffer(data, offset=20, dtype=np.dtype([('length', '>i4'), ('value', element_dtype)]))
+    if (pairs['length'] != element_dtype.itemsize).any():
+        raise ValueError("Unexpected element width in binary array")
+    return pairs['value'].astype(element_dtype.newbyteorder('='))
+
+
+# Workout history for a list of userids with each column aggregated into one binary array
+# value, so the whole result is a single row and no Python object is created per logged set.
+# Both scans run in one statement, so the names match the rows they encode.
+WORKOUT_COLUMNS_QUERY = """
+    WITH names AS (
+        SELECT array_agg(DISTINCT workoutname::text) AS names
+        FROM workoutquestions
+        WHERE userid = ANY(%(userids)s) AND workoutname IS NOT NULL
+    )
+    SELECT (SELECT names FROM names),
+           array_send(array_agg(userid::int4)),
+           array_send(array_agg(COALESCE(
+               array_position((SELECT names FROM names), workoutname::text) - 1, -1)::int4)),
+           array_send(array_agg(COALESCE(muscleid, -1)::int4)),
+           array_send(array_agg(COALESCE(equipmentid, -1)::int4)),
+           array_send(array_agg(COALESCE(weightused::float8, 'NaN'))),
+           array_send(array_agg(COALESCE(setschosen, 0)::int4)),
+           array_send(array_agg(COALESCE(repschosen, 0)::int4))
+    FROM (
+        SELECT userid, workoutname, muscleid, equipmentid, weightused, setschosen, repschosen
+        FROM workoutquestions
+        WHERE userid = ANY(%(userids)s)
+        ORDER BY userid
+    ) ordered
+"""
+
+
+# Parse the WORKOUT_COLUMNS_QUERY row (fetched with a binary cursor) into
+# (workout names, {column: array})
+def workout_columns_from_row(row):
+    names, *arrays = row
+    columns = {name: parse_array_send(data, dtype) for (name, dtype), data in zip(COLUMNAR_FIELDS, arrays)}
+    return names or [], columns
+
+
+# Workout history for one or more users as columnar NumPy arrays.
+# Returns (workout names, {column: array}), where the workoutname column holds codes into
+# the names list (-1 for NULL) and each user's rows are contiguous, ordered by userid.
+@instrument_query
+def fetch_workout_columns(userids):
+    with get_db_connection() as conn, conn.cursor(binary=True) as cur:
+        cur.execute(WORKOUT_COLUMNS_QUERY, {'userids': [int(userid) for userid in userids]})
+        return workout_columns_from_row(cur.fetchone())
@@ -1,19 +1,11 @@
-import os
-from psycopg import connect
-from dotenv import load_dotenv
-
-# Load environment variables from .env file
-load_dotenv()
+from utils.db.db_pool import get_db_connection
+from utils.db.db_metrics_queries import backfill_user_metrics
+from utils.db.db_user_queries import import_member_roster
 
 def get_schema():
     try:
-        # Get the database URL from .env
-        database_url = os.getenv("DATABASE_URL")
-        if not database_url:
-            raise ValueError("DATABASE_URL is not set in .env")
-
-        # Connect to the database
-        with connect(database_url) as conn:
+        # Borrow a connection from the shared pool
+        with get_db_connection() as conn:
             with conn.cursor() as cur:
                 # Query to list all tables in the current database schema
                 cur.execute("""
@@ -113,13 +105,8 @@ def get_schema():
 
 def reset_user_id_sequence():
     try:
-        # Get the database URL from .env
-        database_url = os.getenv("DATABASE_URL")
-        if not database_url:
-            raise ValueError("DATABASE_URL is not set in .env")
-        
-        # Connect to the database
-        with connect(database_url) as conn:
+        # Borrow a connection from the shared pool
+        with get_db_connection() as conn:
             with conn.cursor() as cur:
                 # Retrieve the current maximum id from the User table
                 cur.execute("SELECT MAX(id) FROM \"User\";")
@@ -143,13 +130,8 @@ def reset_user_id_sequence():
 
 def get_users_in_db():
     try:
-        # Get the database URL from .env
-        database_url = os.getenv("DATABASE_URL")
-        if not database_url:
-            raise ValueError("DATABASE_URL is not set in .env")
-
-        # Connect to the database
-        with connect(database_url) as conn:
+        # Borrow a connection from the shared pool
+        with get_db_connection() as conn:
             with conn.cursor() as cur:
                 # Query the User table
                 cur.execute("SELECT * FROM \"User\"")
@@ -177,13 +159,8 @@ def get_users_in_db():
 
 def delete_users():
     try:
-        # Get the database URL from .env
-        database_url = os.getenv("DATABASE_URL")
-        if not database_url:
-            raise ValueError("DATABASE_URL is not set in .env")
-
-        # Connect to the database
-        with connect(database_url) as conn:
+        # Borrow a connection from the shared pool
+        with get_db_connection() as conn:
             with conn.cursor() as cur:
 
                 cur.execute("DELETE FROM users WHERE userid = 3")
@@ -197,4 +174,6 @@ def delete_users():
 get_schema()
 # reset_user_id_sequence()
 #get_users_in_db()
-# delete_users()
\ No newline at end of file
+# delete_users()
+# backfill_user_metrics()
+# print(import_member_roster("roster.csv"))
\ No newline at end of file
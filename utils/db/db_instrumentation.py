@@ -0,0 +1,167 @@
+# utils/db/db_instrumentation.py
+import os
+import time
+import inspect
+import threading
+import functools
+from prometheus_client import (
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    GCCollector,
+    PlatformCollector,
+    ProcessCollector,
+    start_http_server,
+)
+from prometheus_client.core import GaugeMetricFamily
+
+
+# The app's metrics, served by start_metrics_server(), with the process, platform and GC
+# metrics the default registry would include
+METRICS_REGISTRY = CollectorRegistry()
+ProcessCollector(registry=METRICS_REGISTRY)
+PlatformCollector(registry=METRICS_REGISTRY)
+GCCollector(registry=METRICS_REGISTRY)
+
+_metrics = {}
+_metrics_lock = threading.Lock()
+
+
+# Create a metric in METRICS_REGISTRY, or return the one already created under that name.
+# Streamlit's file watcher can re-import the modules that define metrics, and registering
+# a name twice raises.
+def get_or_create_metric(metric_cls, name, documentation, labelnames=(), **kwargs):
+    with _metrics_lock:
+        if name not in _metrics:
+            _metrics[name] = metric_cls(name, documentation, labelnames, registry=METRICS_REGISTRY, **kwargs)
+        return _metrics[name]
+
+
+QUERY_LATENCY = get_or_create_metric(
+    Histogram, "victorylap_db_query_seconds", "Latency of utils.db query functions", ["function"],
+    buckets=(.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10))
+QUERY_ROWS = get_or_create_metric(
+    Histogram, "victorylap_db_query_rows", "Rows returned or written by utils.db query functions", ["function"],
+    buckets=(0, 1, 5, 10, 50, 100, 500, 1000, 5000, 10000, 50000))
+QUERY_ERRORS = get_or_create_metric(
+    Counter, "victorylap_db_query_errors", "Failed utils.db query calls", ["function"])
+POOL_ACQUIRE_LATENCY = get_or_create_metric(
+    Histogram, "victorylap_db_pool_acquire_seconds", "Time spent waiting for a pooled connection",
+    buckets=(.0001, .0005, .001, .005, .01, .05, .1, .5, 1, 5, 10))
+POOL_ACQUIRE_TIMEOUTS = get_or_create_metric(
+    Counter, "victorylap_db_pool_acquire_timeouts", "Connection requests that timed out waiting for the pool")
+
+
+# Row count of a query function's return value
+def _count_rows(result):
+    if result is None or result is False:
+        return 0
+    if isinstance(result, list):
+        return len(result)
+    if isinstance(result, dict) and 'success' in result:
+        return result.get('inserted', result.get('created', 1)) if result['success'] else 0
+    return 1
+
+
+# Call failed: it raised, or returned {"success": False, ...}
+def _is_failure(result):
+    return isinstance(result, dict) and result.get('success') is False
+
+
+# Record one error for a function that catches its own exceptions
+def count_query_error(function):
+    QUERY_ERRORS.labels(function=function).inc()
+
+
+# Time a query function and record its row count and failures, labeled by function name.
+# Works for both sync and async functions.
+def instrument_query(func):
+    name = func.__name__
+
+    def record(start, result):
+        QUERY_LATENCY.labels(function=name).observe(time.perf_counter() - start)
+        QUERY_ROWS.labels(function=name).observe(_count_rows(result))
+        if _is_failure(result):
+            count_query_error(name)
+
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                result = await func(*args, **kwargs)
+            except Exception:
+                QUERY_LATENCY.labels(function=name).observe(time.perf_counter() - start)
+                count_query_error(name)
+                raise
+            record(start, result)
+            return result
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        except Exception:
+            QUERY_LATENCY.labels(function=name).observe(time.perf_counter() - start)
+            count_query_error(name)
+            raise
+        record(start, result)
+        return result
+    return wrapper
+
+
+# Pool gauges are read from the pools at scrape time
+class PoolCollector:
+    GAUGES = {
+        'in_use': ("victorylap_db_pool_in_use", "Connections checked out"),
+        'idle': ("victorylap_db_pool_idle", "Idle connections"),
+        'waiting': ("victorylap_db_pool_waiting", "Requests waiting for a connection"),
+        'size': ("victorylap_db_pool_size", "Open connections"),
+        'max_size': ("victorylap_db_pool_max_size", "Configured maximum pool size"),
+    }
+
+    def _families(self):
+        return {key: GaugeMetricFamily(name, doc, labels=["pool"]) for key, (name, doc) in self.GAUGES.items()}
+
+    def collect(self):
+        from .db_pool import get_pool_stats
+        from .db_async import get_async_pool_stats
+
+        families = self._families()
+        for pool_name, stats in (('sync', get_pool_stats()), ('async', get_async_pool_stats())):
+            for key, family in families.items():
+                family.add_metric([pool_name], stats[key])
+        return families.values()
+
+    # The registry reads the metric names from this, so registering doesn't import the pools
+    def describe(self):
+        return self._families().values()
+
+
+METRICS_REGISTRY.register(PoolCollector())
+
+
+_metrics_server_started = False
+_metrics_server_lock = threading.Lock()
+
+
+# Serve /metrics from the app process on METRICS_ADDR:METRICS_PORT (set the port to 0 to
+# disable). Safe to call on every rerun; only the first call starts the server.
+def start_metrics_server():
+    global _metrics_server_started
+    if _metrics_server_started:
+        return
+    with _metrics_server_lock:
+        if _metrics_server_started:
+            return
+        _metrics_server_started = True
+
+        port = int(os.getenv("METRICS_PORT", "8000"))
+        if not port:
+            return
+        try:
+            start_http_server(port, addr=os.getenv("METRICS_ADDR", "127.0.0.1"), registry=METRICS_REGISTRY)
+        except OSError as e:
+            print(f"Metrics server not started on port {port}: {e}")
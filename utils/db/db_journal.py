@@ -0,0 +1,285 @@
+# utils/db/db_journal.py
+import os
+import uuid
+import sqlite3
+import datetime
+import threading
+import contextlib
+import psycopg
+from prometheus_client import Counter
+from .db_pool import get_db_connection
+from .db_instrumentation import instrument_query, get_or_create_metric
+from .db_catalog import resolve_catalog_ids
+from .db_local_cache import invalidate_local_cache
+
+
+# Local SQLite file that logged sets are written to before they reach Postgres
+JOURNAL_PATH = os.getenv("WORKOUT_JOURNAL_PATH", "workout_journal.sqlite3")
+
+# Entries written to Postgres per INSERT
+JOURNAL_BATCH_SIZE = int(os.getenv("JOURNAL_BATCH_SIZE", "100"))
+
+# Seconds between checks for entries left by other processes or earlier runs
+JOURNAL_POLL_SECONDS = float(os.getenv("JOURNAL_POLL_SECONDS", "5"))
+
+# Backoff after Postgres is unreachable: doubles per failed attempt, up to the maximum
+JOURNAL_RETRY_SECONDS = float(os.getenv("JOURNAL_RETRY_SECONDS", "1"))
+JOURNAL_RETRY_MAX_SECONDS = float(os.getenv("JOURNAL_RETRY_MAX_SECONDS", "60"))
+
+# Errors that mean Postgres can't be reached right now; entries stay pending and are retried.
+# Any other database error fails the entry that caused it.
+TRANSIENT_ERRORS = (psycopg.OperationalError, psycopg.InterfaceError)
+
+JOURNAL_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS workout_journal (
+        entryid INTEGER PRIMARY KEY AUTOINCREMENT,
+        journal_id TEXT NOT NULL UNIQUE,        -- workoutquestions.journal_id once written
+        userid INTEGER NOT NULL,
+        workoutname TEXT NOT NULL,
+        musclegroup TEXT NOT NULL,
+        equipment TEXT NOT NULL,
+        weightused INTEGER NOT NULL,
+        setschosen INTEGER NOT NULL,
+        repschosen INTEGER NOT NULL,
+        logged_at TEXT NOT NULL,                -- when the set was submitted, kept in Postgres
+        status TEXT NOT NULL DEFAULT 'pending', -- pending or failed
+        attempts INTEGER NOT NULL DEFAULT 0,    -- failed attempts to write it
+        last_error TEXT
+    );
+    CREATE INDEX IF NOT EXISTS workout_journal_user_status ON workout_journal (userid, status);
+"""
+
+# Write a batch of entries in one statement. Entries already written (e.g. by another process,
+# or by an attempt whose commit was never acknowledged) are skipped by their journal_id.
+WRITE_ENTRIES_QUERY = """
+    INSERT INTO workoutquestions
+        (journal_id, userid, workoutname, muscleid, equipmentid, weightused, setschosen, repschosen, logged_at)
+    SELECT * FROM unnest(%s::uuid[], %s::int[], %s::text[], %s::int[], %s::int[],
+                         %s::int[], %s::int[], %s::int[], %s::timestamptz[])
+    ON CONFLICT (journal_id) WHERE journal_id IS NOT NULL DO NOTHING
+"""
+
+JOURNAL_ENTRIES = get_or_create_metric(
+    Counter, "victorylap_journal_entries", "Logged sets by journal outcome", ["outcome"])
+
+
+_journal_ready = False
+_journal_lock = threading.Lock()
+
+
+# A connection to the journal, committed on success. Connections are short-lived so the journal
+# can be used from any thread, and from several app processes sharing the file.
+@contextlib.contextmanager
+def journal_connection():
+    global _journal_ready
+    db = sqlite3.connect(JOURNAL_PATH, timeout=30)
+    try:
+        db.execute("PRAGMA synchronous = FULL")
+        if not _journal_ready:
+            with _journal_lock:
+                db.execute("PRAGMA journal_mode = WAL")
+                db.executescript(JOURNAL_SCHEMA)
+                _journal_ready = True
+        with db:
+            yield db
+    finally:
+        db.close()
+
+
+# Record a logged set in the journal and return as soon as it is on disk. The background
+# worker writes it to Postgres; get_journal_status() reports it until then.
+def enqueue_workout(userid, workout_name, muscle_group, equipment, weight_used, sets, reps):
+    logged_at = datetime.datetime.now(datetime.timezone.utc).isoformat()
+    try:
+        with journal_connection() as db:
+            entryid = db.execute("""
+                INSERT INTO workout_journal (journal_id, userid, workoutname, musclegroup, equipment,
+                                             weightused, setschosen, repschosen, logged_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (str(uuid.uuid4()), userid, workout_name, muscle_group, equipment,
+                  int(weight_used), int(sets), int(reps), logged_at)).lastrowid
+    except sqlite3.Error as e:
+        return {"success": False, "error": f"Could not save the workout: {e}"}
+
+    JOURNAL_ENTRIES.labels(outcome="queued").inc()
+    start_journal_worker()
+    _wake.set()
+    return {"success": True, "message": "Workout saved.", "entryid": entryid}
+
+
+# A user's sets that are not in Postgres yet:
+#   pending     number of sets waiting to be written
+#   last_error  why the last attempt failed, if pending sets have been retried
+#   failed      (entryid, workoutname, logged_at, error) for sets that could not be written
+# If the journal can't be read, success is False and error says why.
+def get_journal_status(userid):
+    try:
+        with journal_connection() as db:
+            rows = db.execute("""
+                SELECT entryid, workoutname, logged_at, status, attempts, last_error
+                FROM workout_journal
+                WHERE userid = ?
+                ORDER BY entryid
+            """, (userid,)).fetchall()
+    except sqlite3.Error as e:
+        return {"success": False, "error": f"Could not read saved workouts: {e}"}
+
+    pending = [row for row in rows if row[3] == 'pending']
+    retried = [row for row in pending if row[4] > 0]
+    return {
+        "success": True,
+        "pending": len(pending),
+        "last_error": retried[-1][5] if retried else None,
+        "failed": [(entryid, workoutname, logged_at, error)
+                   for entryid, workoutname, logged_at, status, _, error in rows if status == 'failed'],
+    }
+
+
+# Queue a user's failed sets again
+def retry_failed_workouts(userid):
+    try:
+        with journal_connection() as db:
+            count = db.execute("""
+                UPDATE workout_journal SET status = 'pending', attempts = 0, last_error = NULL
+                WHERE userid = ? AND status = 'failed'
+            """, (userid,)).rowcount
+    except sqlite3.Error as e:
+        return {"success": False, "error": f"Could not retry the workouts: {e}"}
+    _wake.set()
+    return {"success": True, "message": f"{count} workouts queued again."}
+
+
+# Drop a user's failed sets from the journal
+def discard_failed_workouts(userid):
+    try:
+        with journal_connection() as db:
+            count = db.execute(
+                "DELETE FROM workout_journal WHERE userid = ? AND status = 'failed'", (userid,)).rowcount
+    except sqlite3.Error as e:
+        return {"success": False, "error": f"Could not discard the workouts: {e}"}
+    return {"success": True, "message": f"{count} workouts discarded."}
+
+
+def _pending_entries(limit):
+    with journal_connection() as db:
+        return db.execute("""
+            SELECT entryid, journal_id, userid, workoutname, musclegroup, equipment,
+                   weightused, setschosen, repschosen, logged_at
+            FROM workout_journal
+            WHERE status = 'pending'
+            ORDER BY entryid
+            LIMIT ?
+        """, (limit,)).fetchall()
+
+
+# Record an error against entries that are still pending. Entries of the batch that were
+# already written (deleted) or marked failed are left as they are.
+def _mark_failed(entries, error, status='failed'):
+    with journal_connection() as db:
+        count = db.executemany("""
+            UPDATE workout_journal SET status = ?, attempts = attempts + 1, last_error = ?
+            WHERE entryid = ? AND status = 'pending'
+        """, [(status, str(error), entry[0]) for entry in entries]).rowcount
+    if status == 'failed':
+        JOURNAL_ENTRIES.labels(outcome="failed").inc(count)
+
+
+def _remove_entries(entries):
+    with journal_connection() as db:
+        db.executemany("DELETE FROM workout_journal WHERE entryid = ?", [(entry[0],) for entry in entries])
+    JOURNAL_ENTRIES.labels(outcome="written").inc(len(entries))
+    for userid in {entry[2] for entry in entries}:
+        invalidate_local_cache(userid)
+
+
+# Write resolved journal entries. inserted excludes entries that were already written.
+@instrument_query
+def write_journal_entries(entries):
+    columns = [list(column) for column in zip(*[entry[1:] for entry in entries])]
+    with get_db_connection() as conn, conn.cursor() as cur:
+        cur.execute(WRITE_ENTRIES_QUERY, columns)
+        return {"success": True, "inserted": cur.rowcount}
+
+
+# Write the resolved entries in one statement. If one of them is rejected, the batch is
+# rolled back and written one entry at a time so only the rejected entries fail.
+def _write_batch(entries):
+    try:
+        write_journal_entries(entries)
+    except TRANSIENT_ERRORS:
+        raise
+    except psycopg.Error as e:
+        if len(entries) == 1:
+            _mark_failed(entries, e)
+            return
+        for entry in entries:
+            _write_batch([entry])
+        return
+    _remove_entries(entries)
+
+
+# Write every pending journal entry to Postgres in batches of batch_size. Raises one of
+# TRANSIENT_ERRORS if Postgres can't be reached; the entries stay pending.
+# Returns the number of entries written or failed.
+def drain_journal(batch_size=JOURNAL_BATCH_SIZE):
+    handled = 0
+    while True:
+        entries = _pending_entries(batch_size)
+        if not entries:
+            return handled
+
+        resolved, unknown = [], []
+        try:
+            for entry in entries:
+                entryid, journal_id, userid, workoutname, musclegroup, equipment, *sets, logged_at = entry
+                try:
+                    muscleid, equipmentid = resolve_catalog_ids(musclegroup, equipment)
+                except LookupError as e:
+                    unknown.append((entry, e))
+                    continue
+                resolved.append((entryid, journal_id, userid, workoutname, muscleid, equipmentid, *sets, logged_at))
+
+            for entry, error in unknown:
+                _mark_failed([entry], error)
+            if resolved:
+                _write_batch(resolved)
+        except TRANSIENT_ERRORS as e:
+            # Only the entries still in flight are re-pended
+            _mark_failed(entries, e, status='pending')
+            raise
+        handled += len(entries)
+
+
+_wake = threading.Event()
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def _run_worker():
+    failures = 0
+    while True:
+        _wake.clear()
+        try:
+            drain_journal()
+            failures = 0
+            delay = JOURNAL_POLL_SECONDS
+        except TRANSIENT_ERRORS as e:
+            failures += 1
+            delay = min(JOURNAL_RETRY_MAX_SECONDS, JOURNAL_RETRY_SECONDS * 2 ** (failures - 1))
+            print(f"Workout journal: Postgres unavailable, retrying in {delay:g}s: {e}")
+        except Exception as e:
+            delay = JOURNAL_POLL_SECONDS
+            print(f"Workout journal: error writing entries: {e}")
+        _wake.wait(delay)
+
+
+# Start the background thread that writes journal entries to Postgres (once per process).
+# Entries left by an earlier run are written as soon as it starts.
+def start_journal_worker():
+    global _worker
+    if _worker is not None:
+        return
+    with _worker_lock:
+        if _worker is None:
+            _worker = threading.Thread(target=_run_worker, name="workout-journal", daemon=True)
+            _worker.start()
@@ -0,0 +1,106 @@
+# utils/db/db_leaderboard_queries.py
+import os
+from .db_pool import get_db_connection
+from .db_instrumentation import instrument_query, count_query_error
+from .db_local_cache import MISSING, local_get, local_put, local_cached, invalidate_local_cache
+
+
+# Entries shown on a leaderboard by default
+LEADERBOARD_SIZE = 20
+
+# Local cache userid for the gym-wide top-of-board entries
+GYM_WIDE = 0
+
+# Seconds the top of a board is served from the local cache
+LEADERBOARD_TTL = float(os.getenv("LEADERBOARD_TTL", "30"))
+
+# Top members on one workout's board, best first, as (rank, userid, firstname, lastname, best_score).
+# Reads the first `limit` entries of the rank index, so it stays fast however big the board is.
+LEADERBOARD_QUERY = """
+    SELECT rank() OVER (ORDER BY b.best_score DESC), b.userid, u.firstname, u.lastname, b.best_score
+    FROM (
+        SELECT userid, best_score
+        FROM workout_leaderboard
+        WHERE workoutname = %(workoutname)s {gender_filter}
+        ORDER BY best_score DESC, userid
+        LIMIT %(limit)s
+    ) b
+    JOIN users u ON u.userid = b.userid
+    ORDER BY b.best_score DESC, b.userid
+"""
+
+# A member's entries with their rank on the gym-wide and gender boards, as
+# (workoutname, best_score, gym_rank, gender_rank). A rank is one plus the members with a
+# strictly better score, counted from the rank indexes, so no board is read in full.
+USER_RANKS_QUERY = """
+    SELECT e.workoutname, e.best_score,
+           1 + (SELECT count(*) FROM workout_leaderboard b
+                WHERE b.workoutname = e.workoutname AND b.best_score > e.best_score),
+           1 + (SELECT count(*) FROM workout_leaderboard b
+                WHERE b.workoutname = e.workoutname AND b.gender = e.gender
+                  AND b.best_score > e.best_score)
+    FROM workout_leaderboard e
+    WHERE e.userid = %s
+    ORDER BY e.workoutname
+"""
+
+
+# Served from the local cache for up to LEADERBOARD_TTL seconds. Returns [] if the query fails.
+@instrument_query
+def get_leaderboard(workoutname, gender=None, limit=LEADERBOARD_SIZE):
+    # One entry per board variant, so the gym-wide and per-gender boards don't evict each other
+    part = f"leaderboard:{workoutname}:{gender}:{limit}"
+    leaderboard = local_get(GYM_WIDE, part, max_age=LEADERBOARD_TTL)
+    if leaderboard is not MISSING:
+        return leaderboard
+
+    gender_filter = "AND gender = %(gender)s" if gender is not None else ""
+    try:
+        with get_db_connection() as conn, conn.cursor() as cur:
+            cur.execute(LEADERBOARD_QUERY.format(gender_filter=gender_filter),
+                        {'workoutname': workoutname, 'gender': gender, 'limit': limit})
+            leaderboard = cur.fetchall()
+    except Exception as e:
+        count_query_error("get_leaderboard")
+        print(f"Error fetching leaderboard: {e}")
+        return []
+    local_put(GYM_WIDE, part, leaderboard)
+    return leaderboard
+
+
+# A member's standing on every workout they have a score for, as
+# (workoutname, best_score, gym_rank, gender_rank). Served from the local cache for up to
+# LOCAL_CACHE_TTL seconds. Returns [] if the query fails.
+@instrument_query
+def get_user_ranks(userid):
+    ranks = _fetch_user_ranks(userid)
+    return ranks if ranks is not None else []
+
+
+# None when the query fails, so the failure isn't stored in the local cache
+@local_cached('ranks')
+def _fetch_user_ranks(userid):
+    try:
+        with get_db_connection() as conn, conn.cursor() as cur:
+            cur.execute(USER_RANKS_QUERY, (userid,))
+            return cur.fetchall()
+    except Exception as e:
+        count_query_error("get_user_ranks")
+        print(f"Error fetching leaderboard ranks: {e}")
+        return None
+
+
+# Rebuild every leaderboard from the raw history
+@instrument_query
+def rebuild_leaderboards():
+    with get_db_connection() as conn, conn.cursor() as cur:
+        # Block concurrent writers so no set is counted twice or missed
+        cur.execute("LOCK TABLE workoutquestions IN SHARE MODE")
+        cur.execute("""
+            SELECT refresh_workout_leaderboard(ARRAY(
+                SELECT userid FROM workoutquestions UNION SELECT userid FROM workout_leaderboard))
+        """)
+        cur.execute("SELECT COUNT(*) FROM workout_leaderboard")
+        entries = cur.fetchone()[0]
+    invalidate_local_cache()
+    return {"success": True, "message": f"Rebuilt {entries} leaderboard entries."}
@@ -0,0 +1,168 @@
+# utils/db/db_local_cache.py
+import os
+import time
+import pickle
+import sqlite3
+import asyncio
+import functools
+import threading
+import contextlib
+from prometheus_client import Counter
+from .db_instrumentation import get_or_create_metric
+
+
+# SQLite file shared by the app processes on one host, holding per-user query results so
+# View Data renders can be served without a round trip to Postgres. Empty disables it.
+LOCAL_CACHE_PATH = os.getenv("LOCAL_CACHE_PATH", "local_cache.sqlite3")
+
+# Total size of cached values; least recently read entries are evicted beyond it
+LOCAL_CACHE_BYTES = int(os.getenv("LOCAL_CACHE_BYTES", str(256 * 1024 * 1024)))
+
+# Seconds an entry is served without checking Postgres. Writes made through this host drop
+# the user's entries at once; this bounds how long writes made elsewhere take to show up.
+LOCAL_CACHE_TTL = float(os.getenv("LOCAL_CACHE_TTL", "60"))
+
+LOCAL_CACHE_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS cache_entries (
+        userid INTEGER NOT NULL,
+        part TEXT NOT NULL,          -- which read function stored it
+        key BLOB NOT NULL,           -- pickled data version the value belongs to
+        value BLOB NOT NULL,         -- pickled result
+        size INTEGER NOT NULL,
+        stored_at REAL NOT NULL,     -- time.time() when read from Postgres
+        accessed_at REAL NOT NULL,   -- time.time() when last served, for eviction
+        PRIMARY KEY (userid, part)
+    );
+    CREATE INDEX IF NOT EXISTS cache_entries_accessed_at ON cache_entries (accessed_at);
+"""
+
+# Labeled by the part's prefix (e.g. "leaderboard" for "leaderboard:<workout>:...")
+LOCAL_CACHE_READS = get_or_create_metric(
+    Counter, "victorylap_local_cache_reads", "Local cache lookups by part and result", ["part", "result"])
+
+# Returned by local_get when there is no usable entry (None is a valid cached value)
+MISSING = object()
+
+
+_cache_ready = False
+_cache_lock = threading.Lock()
+
+
+# A connection to the cache file, committed on success. Losing the last writes on a crash only
+# costs a refetch, so commits aren't synced to disk.
+@contextlib.contextmanager
+def local_cache_connection():
+    global _cache_ready
+    db = sqlite3.connect(LOCAL_CACHE_PATH, timeout=5)
+    try:
+        db.execute("PRAGMA synchronous = OFF")
+        if not _cache_ready:
+            with _cache_lock:
+                db.execute("PRAGMA journal_mode = WAL")
+                db.executescript(LOCAL_CACHE_SCHEMA)
+                _cache_ready = True
+        with db:
+            yield db
+    finally:
+        db.close()
+
+
+# A user's cached result for one part, or MISSING if there is none for this key, or it is older
+# than max_age seconds. Errors reading the cache count as a miss.
+def local_get(userid, part, key=None, max_age=LOCAL_CACHE_TTL):
+    if not LOCAL_CACHE_PATH:
+        return MISSING
+    now = time.time()
+    try:
+        with local_cache_connection() as db:
+            row = db.execute(
+                "SELECT key, value, stored_at FROM cache_entries WHERE userid = ? AND part = ?",
+                (userid, part)).fetchone()
+            if row is None or row[0] != pickle.dumps(key) or now - row[2] > max_age:
+                LOCAL_CACHE_READS.labels(part=part.partition(":")[0], result="miss").inc()
+                return MISSING
+            db.execute("UPDATE cache_entries SET accessed_at = ? WHERE userid = ? AND part = ?",
+                       (now, userid, part))
+        value = pickle.loads(row[1])
+    except (sqlite3.Error, pickle.PickleError) as e:
+        print(f"Error reading the local cache: {e}")
+        return MISSING
+    LOCAL_CACHE_READS.labels(part=part.partition(":")[0], result="hit").inc()
+    return value
+
+
+# Store a user's result for one part, then evict the least recently read entries until the
+# cache fits in LOCAL_CACHE_BYTES. Values larger than that are not stored.
+def local_put(userid, part, value, key=None):
+    if not LOCAL_CACHE_PATH:
+        return
+    data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+    if len(data) > LOCAL_CACHE_BYTES:
+        return
+    now = time.time()
+    try:
+        with local_cache_connection() as db:
+            db.execute("""
+                INSERT OR REPLACE INTO cache_entries (userid, part, key, value, size, stored_at, accessed_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (userid, part, pickle.dumps(key), data, len(data), now, now))
+            excess = db.execute("SELECT total(size) FROM cache_entries").fetchone()[0] - LOCAL_CACHE_BYTES
+            if excess > 0:
+                _evict(db, excess)
+    except sqlite3.Error as e:
+        print(f"Error writing the local cache: {e}")
+
+
+# Delete the least recently read entries until at least `excess` bytes are freed
+def _evict(db, excess):
+    victims, freed = [], 0
+    for rowid, size in db.execute("SELECT rowid, size FROM cache_entries ORDER BY accessed_at"):
+        victims.append((rowid,))
+        freed += size
+        if freed >= excess:
+            break
+    db.executemany("DELETE FROM cache_entries WHERE rowid = ?", victims)
+
+
+# Drop one user's cached results (after they log or change a set), or everyone's
+def invalidate_local_cache(userid=None):
+    if not LOCAL_CACHE_PATH:
+        return
+    try:
+        with local_cache_connection() as db:
+            if userid is None:
+                db.execute("DELETE FROM cache_entries")
+            else:
+                db.execute("DELETE FROM cache_entries WHERE userid = ?", (userid,))
+    except sqlite3.Error as e:
+        print(f"Error invalidating the local cache: {e}")
+
+
+# Serve a per-user read function (sync or async, taking userid first) from the local cache,
+# calling it only when the user's entry for `part` is missing or older than LOCAL_CACHE_TTL.
+# None results aren't stored, since the read functions also return None when a query fails.
+# For async functions the SQLite calls run in a worker thread, so a busy cache file doesn't
+# stall the event loop.
+def local_cached(part):
+    def decorate(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(userid, *args, **kwargs):
+                value = await asyncio.to_thread(local_get, userid, part)
+                if value is MISSING:
+                    value = await func(userid, *args, **kwargs)
+                    if value is not None:
+                        await asyncio.to_thread(local_put, userid, part, value)
+                return value
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(userid, *args, **kwargs):
+            value = local_get(userid, part)
+            if value is MISSING:
+                value = func(userid, *args, **kwargs)
+                if value is not None:
+                    local_put(userid, part, value)
+            return value
+        return wrapper
+    return decorate
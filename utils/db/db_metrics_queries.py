@@ -0,0 +1,60 @@
+# utils/db/db_metrics_queries.py
+from .db_pool import get_db_connection
+from .db_instrumentation import instrument_query, count_query_error
+from .db_local_cache import local_cached, invalidate_local_cache
+
+
+# Read the trigger-maintained aggregates for one user. Returns None if they have no workouts.
+# Served from the local cache for up to LOCAL_CACHE_TTL seconds.
+@instrument_query
+@local_cached('metric_totals')
+def get_user_metric_totals(userid):
+    try:
+        with get_db_connection() as conn, conn.cursor() as cur:
+            cur.execute("""
+                SELECT total_workouts, weighted_sets, weight_lifted::float8,
+                       max_weighted_volume::float8, max_bodyweight_volume::float8, updated_at
+                FROM user_metrics
+                WHERE userid = %s
+            """, (userid,))
+            row = cur.fetchone()
+    except Exception as e:
+        count_query_error("get_user_metric_totals")
+        print(f"Error fetching user metrics: {e}")
+        return None
+
+    return metric_totals_from_row(row)
+
+
+# Map a user_metrics row (as selected above) to a dict
+def metric_totals_from_row(row):
+    if row is None:
+        return None
+    return {
+        'total_workouts': row[0],
+        'weighted_sets': row[1],
+        'weight_lifted': row[2],
+        'max_weighted_volume': row[3],
+        'max_bodyweight_volume': row[4],
+        'updated_at': row[5],
+    }
+
+
+# Rebuild user_metrics from the raw history, for every member or just the given ones
+@instrument_query
+def backfill_user_metrics(userids=None):
+    with get_db_connection() as conn, conn.cursor() as cur:
+        # Block concurrent writers so no set is counted twice or missed
+        cur.execute("LOCK TABLE workoutquestions IN SHARE MODE")
+        if userids is None:
+            cur.execute("""
+                SELECT refresh_user_metrics(ARRAY(
+                    SELECT userid FROM workoutquestions UNION SELECT userid FROM user_metrics))
+            """)
+        else:
+            cur.execute("SELECT refresh_user_metrics(%s::INTEGER[])", (list(userids),))
+    if userids is None:
+        invalidate_local_cache()
+    else:
+        for userid in userids:
+            invalidate_local_cache(userid)
@@ -0,0 +1,144 @@
+# utils/db/db_pool.py
+import os
+import time
+import atexit
+import threading
+from contextlib import contextmanager
+from dotenv import load_dotenv
+from psycopg_pool import ConnectionPool, PoolTimeout
+from .db_instrumentation import POOL_ACQUIRE_LATENCY, POOL_ACQUIRE_TIMEOUTS
+
+
+# Load environment variables
+load_dotenv()
+
+
+# Pool settings, overridable from .env
+POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "1"))
+POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))            # connections per process, both pools together
+ASYNC_POOL_MAX_SIZE = int(os.getenv("DB_ASYNC_POOL_MAX_SIZE", str(max(1, POOL_MAX_SIZE // 2))))
+SYNC_POOL_MAX_SIZE = max(1, POOL_MAX_SIZE - ASYNC_POOL_MAX_SIZE)
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))              # seconds to wait for a free connection
+POOL_MAX_IDLE = float(os.getenv("DB_POOL_MAX_IDLE", "300"))           # seconds before an idle connection is closed
+POOL_MAX_LIFETIME = float(os.getenv("DB_POOL_MAX_LIFETIME", "3600"))  # seconds before a connection is recycled
+
+
+# One pool per process. Streamlit reruns re-execute the script but keep imported
+# modules, so every session and rerun shares this pool.
+_pool = None
+_pool_lock = threading.Lock()
+
+# Acquire latency bookkeeping (milliseconds)
+_acquire_lock = threading.Lock()
+_acquire_stats = {
+    'acquired': 0,
+    'timeouts': 0,
+    'total_ms': 0.0,
+    'max_ms': 0.0,
+    'last_ms': 0.0,
+}
+
+
+# Create the process-wide pool on first use
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                database_url = os.getenv("DATABASE_URL")
+                if not database_url:
+                    raise ValueError("DATABASE_URL is not set in .env")
+                _pool = ConnectionPool(
+                    conninfo=database_url,
+                    min_size=min(POOL_MIN_SIZE, SYNC_POOL_MAX_SIZE),
+                    max_size=SYNC_POOL_MAX_SIZE,
+                    timeout=POOL_TIMEOUT,
+                    max_idle=POOL_MAX_IDLE,
+                    max_lifetime=POOL_MAX_LIFETIME,
+                    # Health check every connection before handing it out
+                    check=ConnectionPool.check_connection,
+                    name="victorylap",
+                    open=True,
+                )
+                atexit.register(close_pool)
+    return _pool
+
+
+# Borrow a connection from the pool. Commits on success, rolls back on error
+# and always hands the connection back to the pool.
+@contextmanager
+def get_db_connection(timeout=None):
+    pool = get_pool()
+    start = time.perf_counter()
+    try:
+        conn = pool.getconn(timeout=timeout)
+    except PoolTimeout:
+        record_acquire_timeout()
+        raise
+    record_acquire((time.perf_counter() - start) * 1000)
+
+    try:
+        # Pooled connections are not closed on exit, only committed or rolled back
+        with conn:
+            yield conn
+    finally:
+        pool.putconn(conn)
+
+
+# Acquire bookkeeping shared by the sync and async pools
+def record_acquire(elapsed_ms):
+    POOL_ACQUIRE_LATENCY.observe(elapsed_ms / 1000)
+    with _acquire_lock:
+        _acquire_stats['acquired'] += 1
+        _acquire_stats['total_ms'] += elapsed_ms
+        _acquire_stats['last_ms'] = elapsed_ms
+        _acquire_stats['max_ms'] = max(_acquire_stats['max_ms'], elapsed_ms)
+
+
+def record_acquire_timeout():
+    POOL_ACQUIRE_TIMEOUTS.inc()
+    with _acquire_lock:
+        _acquire_stats['timeouts'] += 1
+
+
+def get_acquire_stats():
+    with _acquire_lock:
+        acquire = dict(_acquire_stats)
+    acquire['avg_ms'] = acquire['total_ms'] / acquire['acquired'] if acquire['acquired'] else 0.0
+    return acquire
+
+
+# Snapshot of pool usage: connections in use, requests waiting and acquire latency
+def get_pool_stats():
+    acquire = get_acquire_stats()
+    if _pool is None:
+        return {'open': False, 'in_use': 0, 'idle': 0, 'waiting': 0, 'size': 0,
+                'min_size': POOL_MIN_SIZE, 'max_size': SYNC_POOL_MAX_SIZE, 'acquire': acquire}
+
+    return describe_pool(_pool, acquire)
+
+
+# Summarize a psycopg_pool pool's own counters
+def describe_pool(pool, acquire):
+    stats = pool.get_stats()
+    size = stats.get('pool_size', 0)
+    idle = stats.get('pool_available', 0)
+    return {
+        'open': not pool.closed,
+        'in_use': size - idle,
+        'idle': idle,
+        'waiting': stats.get('requests_waiting', 0),
+        'size': size,
+        'min_size': stats.get('pool_min', pool.min_size),
+        'max_size': stats.get('pool_max', pool.max_size),
+        'acquire': acquire,
+    }
+
+
+# Close the pool (registered at exit, also useful for scripts)
+def close_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
@@ -0,0 +1,571 @@
+# utils/db/db_schema.py
+import threading
+from .db_pool import get_db_connection
+
+
+# Idempotent schema changes the app relies on, applied in order and recorded in
+# schema_migrations so each one runs once per database. Each entry is (name, sql).
+# Only ever append to this list.
+SCHEMA_MIGRATIONS = [
+    # Per-user headline aggregates kept in step with workoutquestions by triggers.
+    # Max strength score depends on body weight, so store the raw maxima and derive it on read.
+    ("user_metrics_table", """
+        CREATE TABLE IF NOT EXISTS user_metrics (
+            userid INTEGER PRIMARY KEY,
+            total_workouts BIGINT NOT NULL DEFAULT 0,
+            weighted_sets BIGINT NOT NULL DEFAULT 0,     -- sets logged with weightused > 0
+            weight_lifted NUMERIC NOT NULL DEFAULT 0,    -- sum of weightused over those sets
+            max_weighted_volume NUMERIC,                 -- max(weightused * sets * reps) over those sets
+            max_bodyweight_volume NUMERIC,               -- max(sets * reps) over bodyweight sets
+            updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+    """),
+    ("user_metrics_functions", """
+        -- Recompute the aggregates for the given users from the raw history
+        CREATE OR REPLACE FUNCTION refresh_user_metrics(p_userids INTEGER[]) RETURNS void AS $$
+        BEGIN
+            DELETE FROM user_metrics WHERE userid = ANY(p_userids);
+            INSERT INTO user_metrics (userid, total_workouts, weighted_sets, weight_lifted,
+                                      max_weighted_volume, max_bodyweight_volume, updated_at)
+            SELECT userid,
+                   COUNT(*),
+                   COUNT(*) FILTER (WHERE weightused > 0),
+                   COALESCE(SUM(weightused) FILTER (WHERE weightused > 0), 0),
+                   MAX(weightused * setschosen * repschosen) FILTER (WHERE weightused > 0),
+                   MAX(setschosen * repschosen) FILTER (WHERE COALESCE(weightused, 0) = 0),
+                   now()
+            FROM workoutquestions
+            WHERE userid = ANY(p_userids)
+            GROUP BY userid;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        -- Fold each inserted set into its user's aggregates
+        CREATE OR REPLACE FUNCTION user_metrics_on_insert() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO user_metrics AS m (userid, total_workouts, weighted_sets, weight_lifted,
+                                           max_weighted_volume, max_bodyweight_volume, updated_at)
+            VALUES (
+                NEW.userid,
+                1,
+                CASE WHEN NEW.weightused > 0 THEN 1 ELSE 0 END,
+                CASE WHEN NEW.weightused > 0 THEN NEW.weightused ELSE 0 END,
+                CASE WHEN NEW.weightused > 0 THEN NEW.weightused * NEW.setschosen * NEW.repschosen END,
+                CASE WHEN COALESCE(NEW.weightused, 0) = 0 THEN NEW.setschosen * NEW.repschosen END,
+                now())
+            ON CONFLICT (userid) DO UPDATE SET
+                total_workouts = m.total_workouts + EXCLUDED.total_workouts,
+                weighted_sets = m.weighted_sets + EXCLUDED.weighted_sets,
+                weight_lifted = m.weight_lifted + EXCLUDED.weight_lifted,
+                max_weighted_volume = GREATEST(m.max_weighted_volume, EXCLUDED.max_weighted_volume),
+                max_bodyweight_volume = GREATEST(m.max_bodyweight_volume, EXCLUDED.max_bodyweight_volume),
+                updated_at = now();
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        -- Maxima can't be decremented, so updates and deletes recompute the affected users
+        CREATE OR REPLACE FUNCTION user_metrics_on_update() RETURNS trigger AS $$
+        BEGIN
+            PERFORM refresh_user_metrics(ARRAY(
+                SELECT userid FROM old_rows UNION SELECT userid FROM new_rows));
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        CREATE OR REPLACE FUNCTION user_metrics_on_delete() RETURNS trigger AS $$
+        BEGIN
+            PERFORM refresh_user_metrics(ARRAY(SELECT DISTINCT userid FROM old_rows));
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+    """),
+    ("user_metrics_triggers", """
+        DROP TRIGGER IF EXISTS user_metrics_insert ON workoutquestions;
+        CREATE TRIGGER user_metrics_insert
+            AFTER INSERT ON workoutquestions
+            FOR EACH ROW EXECUTE FUNCTION user_metrics_on_insert();
+
+        DROP TRIGGER IF EXISTS user_metrics_update ON workoutquestions;
+        CREATE TRIGGER user_metrics_update
+            AFTER UPDATE ON workoutquestions
+            REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION user_metrics_on_update();
+
+        DROP TRIGGER IF EXISTS user_metrics_delete ON workoutquestions;
+        CREATE TRIGGER user_metrics_delete
+            AFTER DELETE ON workoutquestions
+            REFERENCING OLD TABLE AS old_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION user_metrics_on_delete();
+    """),
+
+    # One-off backfill for members who logged workouts before the triggers existed
+    ("user_metrics_backfill", """
+        LOCK TABLE workoutquestions IN SHARE MODE;
+        SELECT refresh_user_metrics(ARRAY(SELECT DISTINCT userid FROM workoutquestions));
+    """),
+
+    # Signup relies on INSERT ... ON CONFLICT (email) instead of checking first
+    # (skipped when the column already has a unique constraint)
+    ("user_email_unique", """
+        DO $$
+        BEGIN
+            IF NOT EXISTS (
+                SELECT 1
+                FROM pg_index i
+                JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = i.indkey[0]
+                WHERE i.indrelid = '"User"'::regclass
+                  AND i.indisunique AND i.indnatts = 1 AND a.attname = 'email'
+            ) THEN
+                CREATE UNIQUE INDEX user_email_key ON "User" (email);
+            END IF;
+        END;
+        $$
+    """),
+
+    # Gym-wide per-workout leaderboards: each member's best strength score per workout,
+    # kept up to date by triggers. Top-K reads walk the rank indexes.
+    ("workout_leaderboard_table", """
+        CREATE TABLE IF NOT EXISTS workout_leaderboard (
+            workoutname TEXT NOT NULL,
+            userid INTEGER NOT NULL,
+            gender TEXT NOT NULL DEFAULT '',
+            best_score DOUBLE PRECISION NOT NULL,
+            updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            PRIMARY KEY (workoutname, userid)
+        );
+        CREATE INDEX IF NOT EXISTS workout_leaderboard_rank_idx
+            ON workout_leaderboard (workoutname, best_score DESC, userid);
+        CREATE INDEX IF NOT EXISTS workout_leaderboard_gender_rank_idx
+            ON workout_leaderboard (workoutname, gender, best_score DESC, userid);
+        CREATE INDEX IF NOT EXISTS workout_leaderboard_userid_idx
+            ON workout_leaderboard (userid);
+    """),
+    ("workout_leaderboard_functions", """
+        -- Strength score as in utils.analytics.metrics (0.97 is BODYWEIGHT_FACTOR)
+        CREATE OR REPLACE FUNCTION strength_score(p_weight NUMERIC, p_sets NUMERIC, p_reps NUMERIC,
+                                                  p_body_weight NUMERIC) RETURNS DOUBLE PRECISION AS $$
+            SELECT round(CASE WHEN p_weight = 0 THEN 0.97 * p_body_weight ELSE p_weight END
+                         * p_sets * p_reps / NULLIF(p_body_weight, 0), 3)::float8
+        $$ LANGUAGE sql IMMUTABLE;
+
+        -- Recompute the leaderboard entries of the given users from the raw history
+        CREATE OR REPLACE FUNCTION refresh_workout_leaderboard(p_userids INTEGER[]) RETURNS void AS $$
+        BEGIN
+            DELETE FROM workout_leaderboard WHERE userid = ANY(p_userids);
+            INSERT INTO workout_leaderboard (workoutname, userid, gender, best_score)
+            SELECT w.workoutname, w.userid, COALESCE(u.gender, ''),
+                   MAX(strength_score(w.weightused, w.setschosen, w.repschosen, u.weight))
+            FROM workoutquestions w
+            JOIN users u ON u.userid = w.userid
+            WHERE w.userid = ANY(p_userids) AND w.workoutname IS NOT NULL
+            GROUP BY w.workoutname, w.userid, u.gender
+            HAVING MAX(strength_score(w.weightused, w.setschosen, w.repschosen, u.weight)) > 0;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        -- Fold the sets inserted by a statement into the boards, one upsert per member and workout
+        CREATE OR REPLACE FUNCTION workout_leaderboard_on_insert() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO workout_leaderboard AS b (workoutname, userid, gender, best_score)
+            SELECT n.workoutname, n.userid, COALESCE(u.gender, ''),
+                   MAX(strength_score(n.weightused, n.setschosen, n.repschosen, u.weight))
+            FROM new_rows n
+            JOIN users u ON u.userid = n.userid
+            WHERE n.workoutname IS NOT NULL
+            GROUP BY n.workoutname, n.userid, u.gender
+            HAVING MAX(strength_score(n.weightused, n.setschosen, n.repschosen, u.weight)) > 0
+            ON CONFLICT (workoutname, userid) DO UPDATE SET
+                best_score = EXCLUDED.best_score,
+                updated_at = now()
+            WHERE EXCLUDED.best_score > b.best_score;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        -- Bests can't be decremented, so updates and deletes recompute the affected members
+        CREATE OR REPLACE FUNCTION workout_leaderboard_on_update() RETURNS trigger AS $$
+        BEGIN
+            PERFORM refresh_workout_leaderboard(ARRAY(
+                SELECT userid FROM old_rows UNION SELECT userid FROM new_rows));
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        CREATE OR REPLACE FUNCTION workout_leaderboard_on_delete() RETURNS trigger AS $$
+        BEGIN
+            PERFORM refresh_workout_leaderboard(ARRAY(SELECT DISTINCT userid FROM old_rows));
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        -- Scores are normalized by body weight and boards are split by gender
+        CREATE OR REPLACE FUNCTION workout_leaderboard_on_user_update() RETURNS trigger AS $$
+        BEGIN
+            PERFORM refresh_workout_leaderboard(ARRAY[NEW.userid]);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+    """),
+    ("workout_leaderboard_triggers", """
+        DROP TRIGGER IF EXISTS workout_leaderboard_insert ON workoutquestions;
+        CREATE TRIGGER workout_leaderboard_insert
+            AFTER INSERT ON workoutquestions
+            REFERENCING NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION workout_leaderboard_on_insert();
+
+        DROP TRIGGER IF EXISTS workout_leaderboard_update ON workoutquestions;
+        CREATE TRIGGER workout_leaderboard_update
+            AFTER UPDATE ON workoutquestions
+            REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION workout_leaderboard_on_update();
+
+        DROP TRIGGER IF EXISTS workout_leaderboard_delete ON workoutquestions;
+        CREATE TRIGGER workout_leaderboard_delete
+            AFTER DELETE ON workoutquestions
+            REFERENCING OLD TABLE AS old_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION workout_leaderboard_on_delete();
+
+        DROP TRIGGER IF EXISTS workout_leaderboard_user_update ON users;
+        CREATE TRIGGER workout_leaderboard_user_update
+            AFTER UPDATE OF weight, gender ON users
+            FOR EACH ROW
+            WHEN (OLD.weight IS DISTINCT FROM NEW.weight OR OLD.gender IS DISTINCT FROM NEW.gender)
+            EXECUTE FUNCTION workout_leaderboard_on_user_update();
+    """),
+    ("workout_leaderboard_backfill", """
+        LOCK TABLE workoutquestions IN SHARE MODE;
+        SELECT refresh_workout_leaderboard(ARRAY(SELECT DISTINCT userid FROM workoutquestions));
+    """),
+
+    # When each set was logged. Rows from before this column have no timestamp and are
+    # left out of the progression series.
+    ("workoutquestions_logged_at", """
+        ALTER TABLE workoutquestions ADD COLUMN IF NOT EXISTS logged_at TIMESTAMPTZ;
+        ALTER TABLE workoutquestions ALTER COLUMN logged_at SET DEFAULT now();
+    """),
+
+    # Weekly progression aggregates, folded forward by triggers as sets are logged.
+    # Bodyweight sets use BODYWEIGHT_FACTOR * the member's body weight when they were logged.
+    ("progress_tables", """
+        CREATE TABLE IF NOT EXISTS weekly_workout_progress (
+            userid INTEGER NOT NULL,
+            workoutname TEXT NOT NULL,
+            week DATE NOT NULL,
+            best_e1rm DOUBLE PRECISION NOT NULL,  -- best estimated one-rep max that week
+            volume DOUBLE PRECISION NOT NULL,     -- sum of adjusted weight * sets * reps
+            sets BIGINT NOT NULL,
+            PRIMARY KEY (userid, workoutname, week)
+        );
+        CREATE TABLE IF NOT EXISTS weekly_muscle_volume (
+            userid INTEGER NOT NULL,
+            muscleid INTEGER NOT NULL,
+            week DATE NOT NULL,
+            volume DOUBLE PRECISION NOT NULL,
+            sets BIGINT NOT NULL,
+            PRIMARY KEY (userid, muscleid, week)
+        );
+    """),
+    ("progress_functions", """
+        -- Epley estimate; a single rep is the weight itself
+        CREATE OR REPLACE FUNCTION estimated_one_rep_max(p_weight DOUBLE PRECISION, p_reps NUMERIC)
+            RETURNS DOUBLE PRECISION AS $$
+            SELECT CASE WHEN p_reps <= 1 THEN p_weight ELSE p_weight * (1 + p_reps / 30.0) END
+        $$ LANGUAGE sql IMMUTABLE;
+
+        -- Weight a set counts as (0.97 is BODYWEIGHT_FACTOR)
+        CREATE OR REPLACE FUNCTION adjusted_weight(p_weight NUMERIC, p_body_weight NUMERIC)
+            RETURNS DOUBLE PRECISION AS $$
+            SELECT (CASE WHEN p_weight = 0 THEN 0.97 * p_body_weight ELSE p_weight END)::float8
+        $$ LANGUAGE sql IMMUTABLE;
+
+        -- Recompute the weekly aggregates of the given users from the raw history
+        CREATE OR REPLACE FUNCTION refresh_progress(p_userids INTEGER[]) RETURNS void AS $$
+        BEGIN
+            DELETE FROM weekly_workout_progress WHERE userid = ANY(p_userids);
+            DELETE FROM weekly_muscle_volume WHERE userid = ANY(p_userids);
+
+            INSERT INTO weekly_workout_progress (userid, workoutname, week, best_e1rm, volume, sets)
+            SELECT w.userid, w.workoutname, date_trunc('week', w.logged_at)::date,
+                   MAX(estimated_one_rep_max(adjusted_weight(w.weightused, u.weight), w.repschosen)),
+                   SUM(adjusted_weight(w.weightused, u.weight) * w.setschosen * w.repschosen),
+                   SUM(w.setschosen)
+            FROM workoutquestions w
+            JOIN users u ON u.userid = w.userid
+            WHERE w.userid = ANY(p_userids) AND w.logged_at IS NOT NULL AND w.workoutname IS NOT NULL
+            GROUP BY 1, 2, 3
+            HAVING MAX(estimated_one_rep_max(adjusted_weight(w.weightused, u.weight), w.repschosen)) IS NOT NULL;
+
+            INSERT INTO weekly_muscle_volume (userid, muscleid, week, volume, sets)
+            SELECT w.userid, w.muscleid, date_trunc('week', w.logged_at)::date,
+                   COALESCE(SUM(adjusted_weight(w.weightused, u.weight) * w.setschosen * w.repschosen), 0),
+                   COALESCE(SUM(w.setschosen), 0)
+            FROM workoutquestions w
+            JOIN users u ON u.userid = w.userid
+            WHERE w.userid = ANY(p_userids) AND w.logged_at IS NOT NULL AND w.muscleid IS NOT NULL
+            GROUP BY 1, 2, 3;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        -- Fold the sets inserted by a statement into their weeks, one upsert per week and key
+        CREATE OR REPLACE FUNCTION progress_on_insert() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO weekly_workout_progress AS p (userid, workoutname, week, best_e1rm, volume, sets)
+            SELECT n.userid, n.workoutname, date_trunc('week', n.logged_at)::date,
+                   MAX(estimated_one_rep_max(adjusted_weight(n.weightused, u.weight), n.repschosen)),
+                   COALESCE(SUM(adjusted_weight(n.weightused, u.weight) * n.setschosen * n.repschosen), 0),
+                   COALESCE(SUM(n.setschosen), 0)
+            FROM new_rows n
+            JOIN users u ON u.userid = n.userid
+            WHERE n.logged_at IS NOT NULL AND n.workoutname IS NOT NULL
+            GROUP BY 1, 2, 3
+            HAVING MAX(estimated_one_rep_max(adjusted_weight(n.weightused, u.weight), n.repschosen)) IS NOT NULL
+            ON CONFLICT (userid, workoutname, week) DO UPDATE SET
+                best_e1rm = GREATEST(p.best_e1rm, EXCLUDED.best_e1rm),
+                volume = p.volume + EXCLUDED.volume,
+                sets = p.sets + EXCLUDED.sets;
+
+            INSERT INTO weekly_muscle_volume AS v (userid, muscleid, week, volume, sets)
+            SELECT n.userid, n.muscleid, date_trunc('week', n.logged_at)::date,
+                   COALESCE(SUM(adjusted_weight(n.weightused, u.weight) * n.setschosen * n.repschosen), 0),
+                   COALESCE(SUM(n.setschosen), 0)
+            FROM new_rows n
+            JOIN users u ON u.userid = n.userid
+            WHERE n.logged_at IS NOT NULL AND n.muscleid IS NOT NULL
+            GROUP BY 1, 2, 3
+            ON CONFLICT (userid, muscleid, week) DO UPDATE SET
+                volume = v.volume + EXCLUDED.volume,
+                sets = v.sets + EXCLUDED.sets;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        -- Maxima can't be decremented, so updates and deletes recompute the affected members
+        CREATE OR REPLACE FUNCTION progress_on_update() RETURNS trigger AS $$
+        BEGIN
+            PERFORM refresh_progress(ARRAY(SELECT userid FROM old_rows UNION SELECT userid FROM new_rows));
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        CREATE OR REPLACE FUNCTION progress_on_delete() RETURNS trigger AS $$
+        BEGIN
+            PERFORM refresh_progress(ARRAY(SELECT DISTINCT userid FROM old_rows));
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+    """),
+    ("progress_triggers", """
+        DROP TRIGGER IF EXISTS progress_insert ON workoutquestions;
+        CREATE TRIGGER progress_insert
+            AFTER INSERT ON workoutquestions
+            REFERENCING NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION progress_on_insert();
+
+        DROP TRIGGER IF EXISTS progress_update ON workoutquestions;
+        CREATE TRIGGER progress_update
+            AFTER UPDATE ON workoutquestions
+            REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION progress_on_update();
+
+        DROP TRIGGER IF EXISTS progress_delete ON workoutquestions;
+        CREATE TRIGGER progress_delete
+            AFTER DELETE ON workoutquestions
+            REFERENCING OLD TABLE AS old_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION progress_on_delete();
+    """),
+
+    # Per-member results of the nightly batch analytics job (utils/analytics/batch.py)
+    ("member_metrics_summary_table", """
+        CREATE TABLE IF NOT EXISTS member_metrics_summary (
+            userid INTEGER PRIMARY KEY,
+            total_workouts BIGINT NOT NULL,
+            weight_lifted DOUBLE PRECISION,
+            avg_weight DOUBLE PRECISION,
+            max_strength_score DOUBLE PRECISION,       -- NULL when the member has no body weight
+            training_volume DOUBLE PRECISION,
+            computed_at TIMESTAMPTZ NOT NULL
+        )
+    """),
+
+    # Workout catalog: which muscle groups belong to each broad category, which workouts
+    # train each muscle group and which equipment each workout can use. Loaded once per
+    # process by utils.db.get_catalog(); catalog_version changes on any edit so running
+    # processes pick changes up without a restart.
+    ("workout_catalog_tables", """
+        CREATE TABLE IF NOT EXISTS catalog_version (
+            id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),  -- single row
+            version BIGINT NOT NULL
+        );
+        INSERT INTO catalog_version (id, version) VALUES (TRUE, 1) ON CONFLICT (id) DO NOTHING;
+
+        CREATE TABLE IF NOT EXISTS muscle_categories (
+            category TEXT NOT NULL,
+            muscleid INTEGER NOT NULL REFERENCES musclegroup(muscleid),
+            position INTEGER NOT NULL,  -- display order of categories and of muscles within them
+            PRIMARY KEY (category, muscleid)
+        );
+        CREATE TABLE IF NOT EXISTS workout_muscles (
+            workoutname TEXT NOT NULL,
+            muscleid INTEGER NOT NULL REFERENCES musclegroup(muscleid),
+            position INTEGER NOT NULL,  -- display order within the muscle group
+            PRIMARY KEY (workoutname, muscleid)
+        );
+        CREATE TABLE IF NOT EXISTS workout_equipment (
+            workoutname TEXT NOT NULL,
+            equipmentid INTEGER NOT NULL REFERENCES equipment(equipmentid),
+            position INTEGER NOT NULL,  -- display order; workouts without rows use "None"
+            PRIMARY KEY (workoutname, equipmentid)
+        );
+    """),
+    ("workout_catalog_version_triggers", """
+        CREATE OR REPLACE FUNCTION bump_catalog_version() RETURNS trigger AS $$
+        BEGIN
+            UPDATE catalog_version SET version = version + 1;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        DO $$
+        DECLARE
+            t TEXT;
+        BEGIN
+            FOREACH t IN ARRAY ARRAY['musclegroup', 'equipment', 'muscle_categories',
+                                     'workout_muscles', 'workout_equipment'] LOOP
+                EXECUTE format('DROP TRIGGER IF EXISTS catalog_version_bump ON %I', t);
+                EXECUTE format('CREATE TRIGGER catalog_version_bump
+                                    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON %I
+                                    FOR EACH STATEMENT EXECUTE FUNCTION bump_catalog_version()', t);
+            END LOOP;
+        END;
+        $$;
+    """),
+    # The catalog previously hardcoded in utils/workout/workout_data.py. musclename and
+    # equipmentname aren't necessarily unique-constrained, so existing names are skipped
+    # with NOT EXISTS rather than ON CONFLICT.
+    ("workout_catalog_seed", """
+        INSERT INTO musclegroup (musclename)
+        SELECT v.musclename
+        FROM (VALUES ('Chest'), ('Back'), ('Shoulders'), ('Biceps'), ('Triceps'), ('Quads'), ('Hamstrings'), ('Glutes'), ('Calves'), ('Core'), ('Full Body'), ('Cardio')
+        ) v(musclename)
+        WHERE NOT EXISTS (SELECT 1 FROM musclegroup m WHERE m.musclename = v.musclename);
+
+        INSERT INTO equipment (equipmentname)
+        SELECT v.equipmentname
+        FROM (VALUES ('None'), ('Barbell'), ('Dumbbells'), ('Cables'), ('Machine')) v(equipmentname)
+        WHERE NOT EXISTS (SELECT 1 FROM equipment e WHERE e.equipmentname = v.equipmentname);
+
+        INSERT INTO muscle_categories (category, muscleid, position)
+        SELECT v.category, m.muscleid, v.position
+        FROM (VALUES
+                ('Upper Body', 'Chest', 1), ('Upper Body', 'Back', 2), ('Upper Body', 'Shoulders', 3), ('Upper Body', 'Biceps', 4),
+                ('Upper Body', 'Triceps', 5), ('Lower Body', 'Quads', 6), ('Lower Body', 'Hamstrings', 7), ('Lower Body', 'Glutes', 8),
+                ('Lower Body', 'Calves', 9), ('Core', 'Core', 10), ('Full Body', 'Full Body', 11), ('Cardio', 'Cardio', 12)
+        ) v(category, musclename, position)
+        JOIN musclegroup m ON m.musclename = v.musclename
+        ON CONFLICT DO NOTHING;
+
+        INSERT INTO workout_muscles (workoutname, muscleid, position)
+        SELECT v.workoutname, m.muscleid, v.position
+        FROM (VALUES
+                ('Bench Press', 'Chest', 1), ('Push Ups', 'Chest', 2), ('Pec Flies', 'Chest', 3), ('Lat pulls', 'Back', 1),
+                ('Rows', 'Back', 2), ('Shoulder Press', 'Shoulders', 1), ('Bicep Curls', 'Biceps', 1), ('Tricep Extensions', 'Triceps', 1),
+                ('Dips', 'Triceps', 2), ('Squats', 'Quads', 1), ('Lunges', 'Quads', 2), ('Leg Press', 'Quads', 3),
+                ('Box Jumps', 'Quads', 4), ('Deadlift', 'Hamstrings', 1), ('Lunges', 'Hamstrings', 2), ('Hip Thrusters', 'Glutes', 1),
+                ('Calf Raises', 'Calves', 1), ('Crunches', 'Core', 1), ('Planks', 'Core', 2), ('Deadlift', 'Full Body', 1),
+                ('Running', 'Cardio', 1), ('Cycling', 'Cardio', 2), ('Jump Rope', 'Cardio', 3)
+        ) v(workoutname, musclename, position)
+        JOIN musclegroup m ON m.musclename = v.musclename
+        ON CONFLICT DO NOTHING;
+
+        INSERT INTO workout_equipment (workoutname, equipmentid, position)
+        SELECT v.workoutname, e.equipmentid, v.position
+        FROM (VALUES
+                ('Pec Flies', 'Dumbbells', 1), ('Dips', 'None', 1), ('Bench Press', 'Barbell', 1), ('Bench Press', 'Dumbbells', 2),
+                ('Push Ups', 'None', 1), ('Bicep Curls', 'Dumbbells', 1), ('Bicep Curls', 'Barbell', 2), ('Bicep Curls', 'Cables', 3),
+                ('Tricep Extensions', 'Dumbbells', 1), ('Tricep Extensions', 'Cables', 2), ('Shoulder Press', 'Dumbbells', 1), ('Shoulder Press', 'Barbell', 2),
+                ('Lat pulls', 'Cables', 1), ('Squats', 'Barbell', 1), ('Squats', 'Dumbbells', 2), ('Lunges', 'Dumbbells', 1),
+                ('Lunges', 'None', 2), ('Leg Press', 'Machine', 1), ('Calf Raises', 'Dumbbells', 1), ('Calf Raises', 'None', 2),
+                ('Deadlift', 'Barbell', 1), ('Hip Thrusters', 'Barbell', 1), ('Running', 'None', 1), ('Cycling', 'None', 1),
+                ('Jump Rope', 'None', 1), ('Planks', 'None', 1), ('Rows', 'Machine', 1), ('Rows', 'Cables', 2),
+                ('Rows', 'Barbell', 3), ('Rows', 'Dumbbells', 4), ('Box Jumps', 'None', 1), ('Crunches', 'None', 1)
+        ) v(workoutname, equipmentname, position)
+        JOIN equipment e ON e.equipmentname = v.equipmentname
+        ON CONFLICT DO NOTHING;
+    """),
+
+    # Id of the local journal entry a set was logged from (utils/db/db_journal.py), so a
+    # journal entry retried after an unacknowledged commit is not inserted twice
+    ("workoutquestions_journal_id", """
+        ALTER TABLE workoutquestions ADD COLUMN IF NOT EXISTS journal_id UUID;
+        CREATE UNIQUE INDEX IF NOT EXISTS workoutquestions_journal_id_idx
+            ON workoutquestions (journal_id) WHERE journal_id IS NOT NULL;
+    """),
+
+    # Sets logged without a weight are bodyweight sets, as in utils.analytics.metrics and
+    # user_metrics. The score functions above returned NULL for them, leaving them off the
+    # leaderboards and out of the weekly progress, so the members with such sets are rebuilt.
+    ("null_weight_as_bodyweight", """
+        CREATE OR REPLACE FUNCTION strength_score(p_weight NUMERIC, p_sets NUMERIC, p_reps NUMERIC,
+                                                  p_body_weight NUMERIC) RETURNS DOUBLE PRECISION AS $$
+            SELECT round(CASE WHEN COALESCE(p_weight, 0) = 0 THEN 0.97 * p_body_weight ELSE p_weight END
+                         * p_sets * p_reps / NULLIF(p_body_weight, 0), 3)::float8
+        $$ LANGUAGE sql IMMUTABLE;
+
+        CREATE OR REPLACE FUNCTION adjusted_weight(p_weight NUMERIC, p_body_weight NUMERIC)
+            RETURNS DOUBLE PRECISION AS $$
+            SELECT (CASE WHEN COALESCE(p_weight, 0) = 0 THEN 0.97 * p_body_weight ELSE p_weight END)::float8
+        $$ LANGUAGE sql IMMUTABLE;
+
+        LOCK TABLE workoutquestions IN SHARE MODE;
+        SELECT refresh_workout_leaderboard(ARRAY(
+            SELECT DISTINCT userid FROM workoutquestions WHERE weightused IS NULL));
+        SELECT refresh_progress(ARRAY(
+            SELECT DISTINCT userid FROM workoutquestions WHERE weightused IS NULL));
+    """),
+]
+
+# Arbitrary key for the advisory lock that serializes app processes migrating at once
+SCHEMA_LOCK_ID = 4815162342
+
+_schema_ready = False
+_schema_lock = threading.Lock()
+
+
+# Apply any SCHEMA_MIGRATIONS not yet recorded in schema_migrations (checked once per process)
+# and return the names applied. Each migration commits on its own, so its locks are held only
+# while it runs, and a failing one leaves the ones before it applied.
+def ensure_schema(verbose=False):
+    global _schema_ready
+    if _schema_ready:
+        return []
+    with _schema_lock:
+        if _schema_ready:
+            return []
+        with get_db_connection() as conn, conn.cursor() as cur:
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS schema_migrations (
+                    name TEXT PRIMARY KEY,
+                    applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+                )
+            """)
+            cur.execute("SELECT name FROM schema_migrations")
+            recorded = {row[0] for row in cur.fetchall()}
+
+        applied = []
+        for name, sql in SCHEMA_MIGRATIONS:
+            if name in recorded:
+                continue
+            with get_db_connection() as conn, conn.cursor() as cur:
+                # Another process may have applied it while this one waited for the lock
+                cur.execute("SELECT pg_advisory_xact_lock(%s)", (SCHEMA_LOCK_ID,))
+                cur.execute("SELECT 1 FROM schema_migrations WHERE name = %s", (name,))
+                if cur.fetchone():
+                    continue
+                if verbose:
+                    print(f"Applying {name}")
+                cur.execute(sql)
+                cur.execute("INSERT INTO schema_migrations (name) VALUES (%s)", (name,))
+            applied.append(name)
+        _schema_ready = True
+        return applied
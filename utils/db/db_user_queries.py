@@ -1,108 +1,119 @@
 # utils/db_utils.py
-import streamlit as st
+import csv
+import functools
 import bcrypt
-import psycopg
-from dotenv import load_dotenv
-import os
+import numpy as np
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from .db_pool import get_db_connection
+from .db_instrumentation import instrument_query, count_query_error
+from .db_catalog import get_catalog, resolve_catalog_ids
+from .db_local_cache import invalidate_local_cache
+
+
+ROSTER_COLUMNS = ['firstname', 'lastname', 'email', 'password', 'gender', 'weight']
+
+WORKOUT_COLUMNS = ['workoutname', 'muscleid', 'equipmentid', 'weightused', 'setschosen', 'repschosen']
+
+WORKOUT_QUESTIONS_QUERY = """
+    SELECT workoutname, muscleid, equipmentid, weightused, setschosen, repschosen
+    FROM workoutquestions
+    WHERE userid = %s
+"""
+
+
+# Bulk-create member accounts from a CSV roster (path or open file) with a header row of
+# firstname,lastname,email,password,gender,weight. Emails already registered are skipped.
+@instrument_query
+def import_member_roster(csv_source):
+    if isinstance(csv_source, str):
+        with open(csv_source, newline='') as f:
+            return _import_roster(f)
+    return _import_roster(csv_source)
+
+
+def _import_roster(csv_file):
+    members = {}
+    errors = []
+    for line_no, record in enumerate(csv.DictReader(csv_file), start=2):
+        values = {col: (record.get(col) or '').strip() for col in ROSTER_COLUMNS}
+        if not all(values.values()):
+            errors.append(f"Line {line_no}: missing required fields")
+            continue
+        if values['gender'] not in ("M", "F"):
+            errors.append(f"Line {line_no}: gender must be M or F")
+            continue
+        try:
+            values['weight'] = int(float(values['weight']))
+        except ValueError:
+            values['weight'] = 0
+        if values['weight'] <= 0:
+            errors.append(f"Line {line_no}: invalid weight")
+            continue
+        if values['email'] in members:
+            errors.append(f"Line {line_no}: duplicate email {values['email']}")
+            continue
+        members[values['email']] = values
+
+    if not members:
+        return {"success": not errors, "created": 0, "skipped": [], "errors": errors}
+
+    # bcrypt releases the GIL, so hash the whole roster across threads
+    with ThreadPoolExecutor() as pool:
+        hashes = pool.map(
+            lambda m: bcrypt.hashpw(m['password'].encode('utf-8'), bcrypt.gensalt()).decode('utf-8'),
+            members.values())
+        for member, hashed_password in zip(members.values(), hashes):
+            member['password'] = hashed_password
 
-
-# Load environment variables
-load_dotenv()
-
-
-# Connect to the DB
-def get_db_connection():
-    return psycopg.connect(os.getenv("DATABASE_URL"))
-
-
-# Check if a user exists. If password is provided, also verify credentials.
-def check_user_exists(email, password = None):
-
-    conn = get_db_connection()
-    cur = conn.cursor()
     try:
-        if password is None:
-            # Just check if email exists
-            cur.execute('SELECT EXISTS(SELECT 1 FROM "User" WHERE email = %s)', (email,))
-            return cur.fetchone()[0]
-        else:
-            # Check email and password
-            cur.execute('SELECT password FROM "User" WHERE email = %s', (email,))
-            result = cur.fetchone()
-            if result:
-                stored_password = result[0]  # This should be the bcrypt hash as a string
-                if stored_password.startswith("\\x"):
-                    # If the hash is in hexadecimal format, decode it back to bytes
-                    stored_password = stored_password[2:]  # Remove '\\x'
-                    stored_password = bytes.fromhex(stored_password)
-
-                # Ensure password is encoded before checking
-                return bcrypt.checkpw(password.encode('utf-8'), stored_password.encode('utf-8') if isinstance(stored_password, str) else stored_password)
-            return False
-    finally:
-        cur.close()
-        conn.close()
-
-
-# Alias for check_user_exists(email) for backwards compatibility
-def check_email_exists(email: str) -> bool:
-
-    return check_user_exists(email)
-
-
-def create_user(firstname, lastname, email, password, gender, weight):
-    # First check if email already exists
-    if check_email_exists(email):
-        raise ValueError("Email already exists")
-        
-    # Hash the password
-    hashed_password = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
-    conn = get_db_connection()
-    cur = conn.cursor()
-    
-    try:
-        # Insert into User table and get the generated id
-        cur.execute(
-            'INSERT INTO "User" (email, password) VALUES (%s, %s) RETURNING id',
-            (email, hashed_password))
-        user_id = cur.fetchone()[0]  # Get the user id after creation
-
-        # Insert into users table, omitting the userid since it is auto-generated
-        cur.execute(
-            """
-            INSERT INTO users (firstname, lastname, gender, weight) 
-            VALUES (%s, %s, %s, %s)
-            """,
-            (firstname, lastname, gender, weight))
-
-        # Commit the transaction
-        conn.commit()
-
-        return user_id  # Return the user id
+        with get_db_connection() as conn, conn.cursor() as cur:
+            cur.execute("""
+                CREATE TEMP TABLE roster_import (
+                    firstname TEXT, lastname TEXT, email TEXT, password TEXT, gender TEXT, weight INTEGER
+                ) ON COMMIT DROP
+            """)
+            with cur.copy("COPY roster_import (firstname, lastname, email, password, gender, weight) FROM STDIN") as copy:
+                for member in members.values():
+                    copy.write_row([member[col] for col in ROSTER_COLUMNS])
+
+            # Create the accounts and their linked profiles in one statement
+            cur.execute("""
+                WITH new_accounts AS (
+                    INSERT INTO "User" (email, password)
+                    SELECT email, password FROM roster_import
+                    ON CONFLICT (email) DO NOTHING
+                    RETURNING id, email
+                ), new_profiles AS (
+                    INSERT INTO users (userid, firstname, lastname, gender, weight)
+                    SELECT a.id, r.firstname, r.lastname, r.gender, r.weight
+                    FROM new_accounts a
+                    JOIN roster_import r ON r.email = a.email
+                )
+                SELECT email FROM new_accounts
+            """)
+            created = {row[0] for row in cur.fetchall()}
     except Exception as e:
-        conn.rollback()
-        raise e
-    finally:
-        cur.close()
-        conn.close()
+        return {"success": False, "created": 0, "skipped": [], "errors": errors + [str(e)]}
 
+    skipped = [email for email in members if email not in created]
+    return {"success": True, "created": len(created), "skipped": skipped, "errors": errors}
+
+@instrument_query
 def get_user_details(email):
-    conn = get_db_connection()
-    cur = conn.cursor()
-    
     try:
-        # Join the "User" and "users" tables based on the user id
-        cur.execute(
-            """
-            SELECT u.userid, u.firstname, u.lastname, u.gender, u.weight
-            FROM users u
-            JOIN "User" usr ON u.userid = usr.id
-            WHERE usr.email = %s
-            """,
-            (email,)
-        )
-        user = cur.fetchone()
+        with get_db_connection() as conn, conn.cursor() as cur:
+            # Join the "User" and "users" tables based on the user id
+            cur.execute(
+                """
+                SELECT u.userid, u.firstname, u.lastname, u.gender, u.weight
+                FROM users u
+                JOIN "User" usr ON u.userid = usr.id
+                WHERE usr.email = %s
+                """,
+                (email,)
+            )
+            user = cur.fetchone()
         
         # If no user is found, return None
         if user is None:
@@ -110,100 +121,133 @@ def get_user_details(email):
         
         return user
     except Exception as e:
+        count_query_error("get_user_details")
         print(f"Error fetching user details: {e}")
         return None
-    finally:
-        cur.close()
-        conn.close()
 
 
+# Workout history for a user as (workoutname, muscleid, equipmentid, weightused,
+# setschosen, repschosen) rows
+@instrument_query
 def get_workout_questions(userid):
-    conn = get_db_connection()
-    cur = conn.cursor()
     try:
-        cur.execute("SELECT workoutname, muscleid, equipmentid, weightused, setschosen, repschosen FROM workoutquestions WHERE userid = %s", (userid,))
-        workout_data = cur.fetchall()
+        with get_db_connection() as conn, conn.cursor() as cur:
+            cur.execute(WORKOUT_QUESTIONS_QUERY, (userid,))
+            return cur.fetchall()
     except Exception as e:
+        count_query_error("get_workout_questions")
         print(f"Error fetching workout data: {e}")
-        workout_data = []
-    finally:
-        cur.close()
-        conn.close()
-    return workout_data
-
-# Cache static musclegroups permanently
-@st.cache_data
+        return []
+
+
+# Lookup tables, served from the workout catalog, which refreshes itself when the
+# catalog tables change
 def get_muscle_groups():
-    conn = get_db_connection()
-    cur = conn.cursor()
-    try:
-        cur.execute("SELECT muscleid, musclename FROM musclegroup")
-        muscle_groups = cur.fetchall()
-        return muscle_groups
-    finally:
-        cur.close()
-        conn.close()
-
-# Cache static equipmentlist permanently
-@st.cache_data
+    return get_catalog().muscle_groups
+
+
 def get_equipment_list():
-    conn = get_db_connection()
-    cur = conn.cursor()
-    try:
-        cur.execute("SELECT equipmentid, equipmentname FROM equipment")
-        equipment = cur.fetchall()
-        return equipment
-    finally:
-        cur.close()
-        conn.close()
+    return get_catalog().equipment_list
+
+
+# name -> id lookups from the catalog; id -> name via get_catalog().muscle_names / equipment_names
+def get_muscle_group_ids():
+    return get_catalog().muscle_ids
+
+
+def get_equipment_ids():
+    return get_catalog().equipment_ids
 
 
+# Resolve muscle group and equipment names to ids without touching the database.
+# An unknown name may mean the catalog changed since it was last checked, so refresh once.
+def resolve_workout_ids(muscle_group, equipment):
+    return resolve_catalog_ids(muscle_group, equipment)
+
+
+@instrument_query
 def insert_workout_data(userid, workout_name, muscle_group, equipment, weight_used, sets, reps):
-    conn = get_db_connection()
-    cur = conn.cursor()
     try:
-        # Fetch muscleid
-        cur.execute("SELECT muscleid FROM musclegroup WHERE musclename = %s", (muscle_group,))
-        muscleid_row = cur.fetchone()
-        if muscleid_row is None:
-            return {"success": False, "error": f"No muscleid found for muscle_group: {muscle_group}"}
-        
-        muscleid = muscleid_row[0]
-
-        # Fetch equipmentid
-        cur.execute("SELECT equipmentid FROM equipment WHERE equipmentname = %s", (equipment,))
-        equipmentid_row = cur.fetchone()
-        if equipmentid_row is None:
-            return {"success": False, "error": f"No equipmentid found for equipment: {equipment}"}
-        
-        equipmentid = equipmentid_row[0]
+        muscleid, equipmentid = resolve_workout_ids(muscle_group, equipment)
+    except LookupError as e:
+        return {"success": False, "error": str(e)}
 
-        # Execute insert statement without the extra workout_score
-        cur.execute("""
-            INSERT INTO workoutquestions (userid, workoutname, muscleid, equipmentid, weightused, setschosen, repschosen)
-            VALUES (%s, %s, %s, %s, %s, %s, %s)
-        """, (userid, workout_name, muscleid, equipmentid, weight_used, sets, reps))
-        
-        conn.commit()
+    try:
+        with get_db_connection() as conn, conn.cursor() as cur:
+            # Execute insert statement without the extra workout_score
+            cur.execute("""
+                INSERT INTO workoutquestions (userid, workoutname, muscleid, equipmentid, weightused, setschosen, repschosen)
+                VALUES (%s, %s, %s, %s, %s, %s, %s)
+            """, (userid, workout_name, muscleid, equipmentid, weight_used, sets, reps))
+
+        invalidate_local_cache(userid)
         return {"success": True, "message": "Workout data inserted successfully."}
     except Exception as e:
-        conn.rollback()
         return {"success": False, "error": str(e)}
-    finally:
-        cur.close()
-        conn.close()
 
 
-# Function to format workout data
-# Cache the mapping function since it uses static lookup data
-@st.cache_data
-def format_workout_data(workout_data):
-    df = pd.DataFrame(workout_data, columns=['workoutname', 'muscleid', 'equipmentid', 'weightused', 'setschosen', 'repschosen'])
+# Insert a whole session in one round trip.
+# workouts is a list of (workout_name, muscle_group, equipment, weight_used, sets, reps).
+@instrument_query
+def insert_workout_batch(userid, workouts):
+    rows = []
+    try:
+        for workout_name, muscle_group, equipment, weight_used, sets, reps in workouts:
+            muscleid, equipmentid = resolve_workout_ids(muscle_group, equipment)
+            rows.append((userid, workout_name, muscleid, equipmentid, weight_used, sets, reps))
+    except LookupError as e:
+        # Nothing is written if any set can't be resolved
+        return {"success": False, "error": str(e)}
+
+    if not rows:
+        return {"success": True, "message": "No workout data to insert.", "inserted": 0}
+
+    try:
+        with get_db_connection() as conn, conn.cursor() as cur:
+            with cur.copy("""
+                COPY workoutquestions (userid, workoutname, muscleid, equipmentid, weightused, setschosen, repschosen)
+                FROM STDIN
+            """) as copy:
+                for row in rows:
+                    copy.write_row(row)
+
+        invalidate_local_cache(userid)
+        return {"success": True, "message": f"{len(rows)} workouts inserted successfully.", "inserted": len(rows)}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+
+# Precompute, once per lookup table, how to turn ids into Categorical codes:
+# sorted ids for searchsorted, the code of each sorted id, and the category names
+@functools.lru_cache(maxsize=16)
+def _lookup_codes(lookup_table):
+    ids = np.array([row[0] for row in lookup_table], dtype=np.int64)
+    categories, codes = np.unique(np.array([row[1] for row in lookup_table], dtype=object), return_inverse=True)
+    order = np.argsort(ids)
+    return ids[order], codes[order], pd.Index(categories)
+
+
+# Map an id column to a Categorical of names; ids missing from the table become NaN
+def _lookup_categorical(id_values, lookup_table):
+    sorted_ids, sorted_codes, categories = _lookup_codes(lookup_table)
+    ids = pd.array(id_values, dtype="Int64").fillna(-1).to_numpy(dtype=np.int64)
+    if len(sorted_ids) == 0:
+        return pd.Categorical.from_codes(np.full(len(ids), -1), categories=categories)
+    pos = np.minimum(np.searchsorted(sorted_ids, ids), len(sorted_ids) - 1)
+    codes = np.where(sorted_ids[pos] == ids, sorted_codes[pos], -1)
+    return pd.Categorical.from_codes(codes, categories=categories)
+
+
+# Function to format workout data (get_workout_questions rows).
+# Muscle group and equipment names are joined through precomputed Categorical codes.
+# Lookup tables already loaded by the caller can be passed in to skip fetching them here.
+def format_workout_data(workout_data, muscle_groups=None, equipment_list=None):
+    df = pd.DataFrame(workout_data, columns=WORKOUT_COLUMNS)
 
-    muscle_groups = {mg[0]: mg[1] for mg in get_muscle_groups()}
-    equipment_list = {eq[0]: eq[1] for eq in get_equipment_list()}
+    muscle_groups = tuple(muscle_groups if muscle_groups is not None else get_muscle_groups())
+    equipment_list = tuple(equipment_list if equipment_list is not None else get_equipment_list())
     
-    df['muscle_group'] = df['muscleid'].map(muscle_groups.get)
-    df['equipment'] = df['equipmentid'].map(equipment_list.get)
+    df['muscle_group'] = _lookup_categorical(df['muscleid'].to_numpy(), muscle_groups)
+    df['equipment'] = _lookup_categorical(df['equipmentid'].to_numpy(), equipment_list)
     
     return df
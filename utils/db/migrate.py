@@ -0,0 +1,17 @@
+# utils/db/migrate.py
+# Apply pending schema changes (SCHEMA_MIGRATIONS in db_schema.py). Run it before starting the
+# app for the first time and after each upgrade; the app itself doesn't change the schema.
+#
+# Run from the repo root:  python -m utils.db.migrate
+import sys
+import argparse
+from utils.db.db_schema import ensure_schema
+
+
+if __name__ == "__main__":
+    argparse.ArgumentParser(description="Apply pending schema changes.").parse_args()
+    try:
+        applied = ensure_schema(verbose=True)
+    except Exception as e:
+        sys.exit(f"Migration failed: {e}")
+    print(f"Applied {len(applied)} migrations." if applied else "Schema is up to date.")
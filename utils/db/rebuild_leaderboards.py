@@ -0,0 +1,13 @@
+# utils/db/rebuild_leaderboards.py
+# Rebuild every gym-wide leaderboard from the raw workout history, e.g. after a bulk import or
+# a change to the strength-score formula. Logging sets waits until it finishes, since the
+# rebuild holds a SHARE lock on workoutquestions.
+#
+# Run from the repo root:  python -m utils.db.rebuild_leaderboards
+import argparse
+from utils.db.db_leaderboard_queries import rebuild_leaderboards
+
+
+if __name__ == "__main__":
+    argparse.ArgumentParser(description="Rebuild every leaderboard from the raw workout history.").parse_args()
+    print(rebuild_leaderboards()["message"])
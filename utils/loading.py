@@ -0,0 +1,42 @@
+# utils/loading.py
+from contextlib import contextmanager
+import streamlit as st
+from utils.rerun_timing import rerun_stage
+
+
+# Progress bar for a page that loads in a fixed sequence of stages. The bar moves once per
+# finished stage, so it reflects real work and costs one websocket delta per stage. Whatever a
+# stage writes to the page is sent as soon as it's written, so earlier sections show while
+# later stages are still running.
+#
+#   loader = StagedLoader("View Data", [("load_data", "Loading your stats"), ...])
+#   with loader.stage("load_data"):
+#       ...
+class StagedLoader:
+    def __init__(self, title, stages):
+        self.title = title
+        self.stages = stages  # (stage name, status text), in the order they run
+        self.done = 0
+        self.bar = st.progress(0, text=self.status(0))
+
+    def status(self, index):
+        return f"{self.title}: {self.stages[index][1]}..."
+
+    # Run one stage, timed as a rerun stage, and advance the bar when it finishes.
+    # The bar is removed after the last stage, or if a stage raises.
+    @contextmanager
+    def stage(self, name):
+        index = self.done
+        if self.stages[index][0] != name:
+            raise ValueError(f"Stage {name!r} ran out of order; expected {self.stages[index][0]!r}")
+        try:
+            with rerun_stage(name):
+                yield
+        except BaseException:
+            self.bar.empty()
+            raise
+        self.done += 1
+        if self.done < len(self.stages):
+            self.bar.progress(self.done / len(self.stages), text=self.status(self.done))
+        else:
+            self.bar.empty()
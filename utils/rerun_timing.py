@@ -0,0 +1,114 @@
+# utils/rerun_timing.py
+import os
+import time
+import threading
+from contextlib import contextmanager
+from prometheus_client import Histogram
+from utils.db import get_or_create_metric
+
+
+# Reruns slower than this many milliseconds are printed with their stage breakdown (0 disables)
+SLOW_RERUN_MS = float(os.getenv("SLOW_RERUN_MS", "0"))
+
+STAGE_BUCKETS = (.001, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10)
+
+RERUN_SECONDS = get_or_create_metric(
+    Histogram, "victorylap_rerun_seconds", "Wall time of a full script rerun", ["tab"],
+    buckets=STAGE_BUCKETS)
+STAGE_SECONDS = get_or_create_metric(
+    Histogram, "victorylap_rerun_stage_seconds", "Wall time of a rerun stage", ["stage", "tab"],
+    buckets=STAGE_BUCKETS)
+STAGE_CPU_SECONDS = get_or_create_metric(
+    Histogram, "victorylap_rerun_stage_cpu_seconds", "CPU time of a rerun stage on the script thread", ["stage", "tab"],
+    buckets=STAGE_BUCKETS)
+
+
+# Each Streamlit session reruns on its own script thread, so the active timer is per thread
+_current = threading.local()
+
+
+# Streamlit session id of the running script, if there is one
+def _session_id():
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        ctx = get_script_run_ctx()
+        return ctx.session_id if ctx else "none"
+    except Exception:
+        return "none"
+
+
+class RerunTimer:
+    def __init__(self, session_id):
+        self.session_id = session_id
+        self.tab = "none"
+        self.stages = []  # (name, wall_s, cpu_s) in completion order; nested stages are inclusive
+        self.start_wall = time.perf_counter()
+        self.start_cpu = time.thread_time()
+
+    def record(self, name, wall, cpu):
+        self.stages.append((name, wall, cpu))
+
+    def finish(self):
+        wall = time.perf_counter() - self.start_wall
+        cpu = time.thread_time() - self.start_cpu
+        RERUN_SECONDS.labels(tab=self.tab).observe(wall)
+        for name, stage_wall, stage_cpu in self.stages:
+            STAGE_SECONDS.labels(stage=name, tab=self.tab).observe(stage_wall)
+            STAGE_CPU_SECONDS.labels(stage=name, tab=self.tab).observe(stage_cpu)
+
+        if SLOW_RERUN_MS and wall * 1000 >= SLOW_RERUN_MS:
+            breakdown = ", ".join(
+                f"{name} {stage_wall * 1000:.1f}ms (cpu {stage_cpu * 1000:.1f}ms)"
+                for name, stage_wall, stage_cpu in self.stages)
+            print(f"Slow rerun {wall * 1000:.1f}ms (cpu {cpu * 1000:.1f}ms) "
+                  f"session={self.session_id} tab={self.tab} | {breakdown}")
+        return wall, cpu
+
+
+# Time one script rerun. Stages recorded inside are exported when it ends,
+# including reruns cut short by st.rerun() or st.stop().
+@contextmanager
+def rerun_timer():
+    timer = RerunTimer(_session_id())
+    _current.timer = timer
+    try:
+        yield timer
+    finally:
+        _current.timer = None
+        timer.finish()
+
+
+# Time a stage of the current rerun (wall and CPU). A no-op outside rerun_timer().
+@contextmanager
+def rerun_stage(name):
+    timer = getattr(_current, 'timer', None)
+    if timer is None:
+        yield
+        return
+    start_wall = time.perf_counter()
+    start_cpu = time.thread_time()
+    try:
+        yield
+    finally:
+        timer.record(name, time.perf_counter() - start_wall, time.thread_time() - start_cpu)
+
+
+# Tag the current rerun with the selected tab
+def set_rerun_tab(tab):
+    timer = getattr(_current, 'timer', None)
+    if timer is not None:
+        timer.tab = tab
+
+
+# Time the body of an st.fragment. During a full rerun it is one stage of that rerun;
+# when the fragment reruns on its own it is timed as a rerun of the given tab.
+@contextmanager
+def fragment_timer(name, tab):
+    if getattr(_current, 'timer', None) is not None:
+        with rerun_stage(name):
+            yield
+        return
+    with rerun_timer() as timer:
+        timer.tab = tab
+        with rerun_stage(name):
+            yield
@@ -2,10 +2,13 @@ from .workout_utils import (
     get_available_equipment,
     get_workouts_for_muscle,
     get_muscles_for_category,
-    initialize_workout_selections
+    get_muscles_for_workout,
+    get_workouts_for_equipment,
+    get_option_tree,
+    initialize_workout_selections,
 )
 from .workout_data import (
     workout_names_dict,
     workout_equipment,
     broad_to_specific
-)
\ No newline at end of file
+)
@@ -1,4 +1,6 @@
 #utils/workout/workout_data.py
+# The original workout catalog. The workout_catalog_seed migration loaded it into the
+# database, which is now the source of truth: edit the catalog tables, not this file.
 
 # Dictionary for the workout names
 workout_names_dict = {
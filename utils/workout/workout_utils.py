@@ -1,31 +1,46 @@
 # utils/workout/workout_utils.py
-from .workout_data import(
-    workout_equipment,
-    broad_to_specific, 
-    workout_names_dict,)
+from utils.db import get_catalog
 
 
 # Get available equipment options for a given workout
 def get_available_equipment(workout_name):
-    return workout_equipment.get(workout_name, ["None"])
+    return list(get_catalog().workout_equipment.get(workout_name, ["None"]))
 
 
 # Get available workouts for a given muscle group
 def get_workouts_for_muscle(muscle_group):
-    return workout_names_dict.get(muscle_group, [])
+    return list(get_catalog().muscle_workouts.get(muscle_group, []))
 
 
 # Get available muscle groups for a broad category
 def get_muscles_for_category(broad_category):
-    return broad_to_specific.get(broad_category, [])
+    return list(get_catalog().categories.get(broad_category, []))
+
+
+# Get the muscle groups a workout trains
+def get_muscles_for_workout(workout_name):
+    return list(get_catalog().workout_muscles.get(workout_name, []))
+
+
+# Get the workouts that can be done with a piece of equipment
+def get_workouts_for_equipment(equipment):
+    return list(get_catalog().equipment_workouts.get(equipment, []))
+
+
+# Broad category -> muscle group -> workout -> equipment options, in display order. Built once
+# per catalog version, so each level of the logging form's cascade is a dict lookup.
+def get_option_tree():
+    return get_catalog().option_tree
 
 
 # Initialize default workout selections
 def initialize_workout_selections():
-    first_category = "Upper Body"
-    first_muscle = broad_to_specific[first_category][0]
-    first_workout = workout_names_dict[first_muscle][0]
-    first_equipment = workout_equipment.get(first_workout, ["None"])[0]
+    option_tree = get_option_tree()
+    first_category = "Upper Body" if "Upper Body" in option_tree else next(iter(option_tree), None)
+    first_muscle = next(iter(option_tree.get(first_category, {})), None)
+    workouts = option_tree.get(first_category, {}).get(first_muscle, {})
+    first_workout = next(iter(workouts), None)
+    first_equipment = workouts.get(first_workout, ("None",))[0]
     
     return {
         'broad_category': first_category,
@@ -33,5 +48,3 @@ def initialize_workout_selections():
         'workout_name': first_workout,
         'equipment': first_equipment
     }
-
-